@@ -0,0 +1 @@
+"""재현 가능한 벤치마크/부하 테스트 (python -m bench.run --help)."""
@@ -0,0 +1,40 @@
+"""두 결과 JSON 의 시나리오별 p95/처리량/쿼리 수 비교.
+
+    python -m bench.compare bench/results/before.json bench/results/after.json
+"""
+import json
+import sys
+
+
+def _delta(old, new):
+    if not old:
+        return "     -"
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print(__doc__)
+        return 2
+    with open(argv[0], encoding="utf-8") as f:
+        before = json.load(f)
+    with open(argv[1], encoding="utf-8") as f:
+        after = json.load(f)
+
+    print(f"{before['meta']['revision']} -> {after['meta']['revision']}")
+    print(f"{'scenario':18} {'p95 ms':>18} {'':>7} {'req/s':>16} {'':>7} {'q/req':>13}")
+    for name, new in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if old is None:
+            print(f"{name:18} (새 시나리오) p95 {new['p95_ms']:.2f}ms")
+            continue
+        print(f"{name:18} {old['p95_ms']:8.2f} {new['p95_ms']:8.2f} {_delta(old['p95_ms'], new['p95_ms'])}"
+              f" {old['throughput_rps']:7.1f} {new['throughput_rps']:7.1f} "
+              f"{_delta(old['throughput_rps'], new['throughput_rps'])}"
+              f" {old['queries_per_request']:6.2f} {new['queries_per_request']:6.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
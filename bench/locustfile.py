@@ -0,0 +1,48 @@
+"""실행 중인 서버(gunicorn 등)에 bench.run 과 같은 시나리오 가중치로 부하를 준다.
+
+    pip install locust
+    python -m bench.run --scale small --requests 0   # 시드만
+    DATABASE_URL=sqlite:///$PWD/bench/bench.db RATELIMIT_ENABLED=0 gunicorn -c gunicorn.conf.py wsgi:app
+    locust -f bench/locustfile.py --host http://localhost:8000
+
+서버는 WTF_CSRF_ENABLED=False 로 띄워야 로그인/쓰기 시나리오가 통과한다.
+요청 수 제한(oneday.ratelimit)도 RATELIMIT_ENABLED=0 으로 꺼야 한다: 켜 두면 쓰기 시나리오 대부분이 429 로 끝난다.
+"""
+import random
+
+from locust import HttpUser, between
+
+from bench.run import SCENARIOS
+from bench.seed import PASSWORD, SCALES
+
+SCALE = "small"
+
+
+class OnedayUser(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        users, questions, _, courses, _ = SCALES[SCALE]
+        self.rng = random.Random()
+        self.ctx = {
+            "questions": questions, "max_course_id": courses, "sessions": courses * 5,
+            "slugs": ["group-cooking", "photo-pt", "flying-yoga", "coffee-dripbag"],
+            "popular": [], "mid_cursor": "", "mid_page": 1,
+        }
+        self.client.post("/auth/login", data={
+            "username": f"bench{self.rng.randint(1, users)}", "password": PASSWORD,
+        })
+
+
+def _make_task(name, func):
+    def run(self):
+        method, url, data = func(self.rng, self.ctx)
+        self.client.request(method, url, data=data, name=name)
+    run.__name__ = name
+    return run
+
+
+# 로그인 상태 하나로 돌리므로 로그인 필요 여부는 구분하지 않는다. qna_deep 은 커서가 필요해 뺀다.
+OnedayUser.tasks = {
+    _make_task(name, func): weight for name, weight, _, func in SCENARIOS if name != "qna_deep"
+}
@@ -0,0 +1,341 @@
+"""실제 라우트를 Flask test client 로 호출해 지연시간/처리량/요청당 쿼리 수를 잰다.
+
+    python -m bench.run --scale tiny                    # 시드 + 전체 시나리오
+    python -m bench.run --scale small --only qna,detail  # 일부만
+    python -m bench.run --mix 30 --threads 4             # 가중치 섞인 부하 30초
+    python -m bench.compare bench/results/a.json bench/results/b.json
+
+DB 는 --db 경로의 SQLite 파일(기본 bench/bench.db)이고, 같은 --scale/--seed 로
+이미 시드된 파일이 있으면 다시 만들지 않는다.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (이름, 가중치, 로그인 필요 여부, 요청 생성 함수) — 가중치는 --mix 에서만 쓴다
+SCENARIOS = []
+
+
+def scenario(name, weight=1, login=False):
+    def decorator(func):
+        SCENARIOS.append((name, weight, login, func))
+        return func
+    return decorator
+
+
+@scenario("home", weight=5)
+def _home(rng, ctx):
+    return "GET", "/", None
+
+
+@scenario("class_page", weight=3)
+def _class_page(rng, ctx):
+    return "GET", f"/class/{rng.choice(ctx['slugs'])}", None
+
+
+@scenario("qna", weight=5)
+def _qna(rng, ctx):
+    return "GET", "/qna", None
+
+
+@scenario("qna_deep", weight=1)
+def _qna_deep(rng, ctx):
+    return "GET", f"/question/list/?after={ctx['mid_cursor']}&page={ctx['mid_page']}", None
+
+
+@scenario("detail", weight=8)
+def _detail(rng, ctx):
+    # 답변이 많은 글이 자주 열리도록 절반은 인기 글에서 고른다
+    if rng.random() < 0.5 and ctx["popular"]:
+        return "GET", f"/question/detail/{rng.choice(ctx['popular'])}/", None
+    return "GET", f"/question/detail/{rng.randint(1, ctx['questions'])}/", None
+
+
+@scenario("search", weight=3)
+def _search(rng, ctx):
+    from bench.seed import WORDS
+    from oneday.search import TRIGRAM
+    # 3글자 미만은 검색하지 않고 안내만 하므로 색인을 타는 단어로 잰다
+    return "GET", f"/question/search/?q={rng.choice([w for w in WORDS if len(w) >= TRIGRAM])}", None
+
+
+@scenario("answer_create", weight=1, login=True)
+def _answer_create(rng, ctx):
+    return "POST", f"/answer/create/{rng.randint(1, ctx['questions'])}", {"content": "벤치마크 답변입니다."}
+
+
+@scenario("workspace", weight=3)
+def _workspace(rng, ctx):
+    return "GET", "/course/workspace?tab=completed", None
+
+
+@scenario("course_api", weight=3)
+def _course_api(rng, ctx):
+    sort = rng.choice(["created_at", "price"])
+    return "GET", f"/course/api?sort={sort}&per_page=20&min_price={rng.randrange(10_000, 100_000, 10_000)}", None
+
+
+@scenario("availability", weight=2)
+def _availability(rng, ctx):
+    return "GET", f"/reservations/availability/{rng.randint(1, ctx['max_course_id'])}?month=2026-01", None
+
+
+@scenario("reservations", weight=2, login=True)
+def _reservations(rng, ctx):
+    return "GET", "/reservations/", None
+
+
+@scenario("reservation_book", weight=1, login=True)
+def _reservation_book(rng, ctx):
+    return "POST", "/reservations/new", {"session_id": str(rng.randint(1, ctx["sessions"]))}
+
+
+@scenario("mypage", weight=1, login=True)
+def _mypage(rng, ctx):
+    return "GET", "/auth/mypage", None
+
+
+@scenario("healthz", weight=1)
+def _healthz(rng, ctx):
+    return "GET", "/readyz", None
+
+
+class QueryCounter:
+    """스레드별 SQL 실행 횟수."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, *args, **kwargs):
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    def take(self):
+        n = getattr(self._local, "count", 0)
+        self._local.count = 0
+        return n
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies, queries, statuses, wall):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else 0.0,
+        "max_queries": max(queries, default=0),
+        "statuses": dict(Counter(str(s) for s in statuses)),
+    }
+
+
+def make_client(app, login):
+    from bench.seed import PASSWORD
+
+    client = app.test_client()
+    if login:
+        response = client.post("/auth/login", data={"username": "bench1", "password": PASSWORD})
+        if response.status_code != 302:
+            raise SystemExit("벤치 사용자 로그인 실패 (시드가 끝났는지 확인)")
+    return client
+
+
+def call(client, counter, method, url, data):
+    counter.take()
+    started = time.perf_counter()
+    response = client.open(url, method=method, data=data)
+    response.get_data()
+    elapsed = time.perf_counter() - started
+    return elapsed, counter.take(), response.status_code
+
+
+def run_scenario(app, counter, ctx, func, login, requests, warmup, rng):
+    client = make_client(app, login)
+    for _ in range(warmup):
+        call(client, counter, *func(rng, ctx))
+    latencies, queries, statuses = [], [], []
+    started = time.perf_counter()
+    for _ in range(requests):
+        elapsed, n, status = call(client, counter, *func(rng, ctx))
+        latencies.append(elapsed)
+        queries.append(n)
+        statuses.append(status)
+    return summarize(latencies, queries, statuses, time.perf_counter() - started)
+
+
+def run_mix(app, counter, ctx, seconds, threads, seed_value):
+    """locust 처럼 가중치대로 시나리오를 섞어 threads 개 사용자가 seconds 동안 요청한다."""
+    names = [s[0] for s in SCENARIOS]
+    weights = [s[1] for s in SCENARIOS]
+    deadline = time.perf_counter() + seconds
+    lock = threading.Lock()
+    per_name = {name: ([], [], []) for name in names}
+
+    def user(index):
+        rng = random.Random(seed_value + index)
+        clients = {False: make_client(app, False), True: make_client(app, True)}
+        while time.perf_counter() < deadline:
+            name, _, login, func = rng.choices(SCENARIOS, weights)[0]
+            elapsed, n, status = call(clients[login], counter, *func(rng, ctx))
+            with lock:
+                bucket = per_name[name]
+                bucket[0].append(elapsed)
+                bucket[1].append(n)
+                bucket[2].append(status)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(user, range(threads)))
+    wall = time.perf_counter() - started
+
+    result = {name: summarize(*per_name[name], wall) for name in names if per_name[name][0]}
+    everything = [sum((per_name[n][i] for n in names), []) for i in range(3)]
+    result["_total"] = summarize(*everything, wall)
+    return result
+
+
+def build_context(db, scale):
+    from oneday.models import ClassSession, Course, Question
+    from oneday.pagination import encode_cursor
+
+    questions = db.session.scalar(db.select(db.func.count(Question.id)))
+    mid = db.session.execute(
+        db.select(Question.create_date, Question.id).order_by(Question.create_date.desc(), Question.id.desc())
+        .offset(questions // 2).limit(1)
+    ).one()
+    popular = db.session.scalars(
+        db.select(Question.id).order_by(Question.answer_count.desc()).limit(20)
+    ).all()
+    return {
+        "scale": scale,
+        "questions": questions,
+        "max_course_id": db.session.scalar(db.select(db.func.max(Course.id))),
+        "slugs": db.session.scalars(db.select(Course.slug).where(Course.slug.isnot(None))).all(),
+        "sessions": db.session.scalar(db.select(db.func.count(ClassSession.id))),
+        "mid_cursor": encode_cursor(list(mid)),
+        "mid_page": questions // 2 // 30 + 1,
+        "popular": popular,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    from bench.seed import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="tiny")
+    parser.add_argument("--users", type=int, help="스케일 기본값 덮어쓰기")
+    parser.add_argument("--questions", type=int)
+    parser.add_argument("--answers", type=int)
+    parser.add_argument("--courses", type=int)
+    parser.add_argument("--reservations", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=os.path.join(HERE, "bench.db"))
+    parser.add_argument("--reseed", action="store_true", help="DB 를 지우고 다시 시드")
+    parser.add_argument("--requests", type=int, default=200, help="시나리오별 측정 요청 수")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--only", help="쉼표로 구분한 시나리오 이름")
+    parser.add_argument("--mix", type=float, metavar="SECONDS", help="가중치 혼합 부하를 SECONDS 동안")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--out", help="결과 JSON 경로 (기본 bench/results/<시각>-<리비전>.json)")
+    args = parser.parse_args(argv)
+
+    counts = dict(zip(("users", "questions", "answers", "courses", "reservations"), SCALES[args.scale]))
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+    marker = args.db + ".json"
+    wanted = dict(counts, seed=args.seed)
+
+    if args.reseed or not os.path.exists(marker) or json.load(open(marker)) != wanted:
+        for suffix in ("", "-wal", "-shm", ".json"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    # create_app 이 config 를 읽기 전에 정해야 한다
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.abspath(args.db)
+    os.environ["RATELIMIT_ENABLED"] = "0"  # 한 IP/사용자로 쓰기를 몰아 보내므로 요청 수 제한은 끈다
+
+    from flask_migrate import upgrade
+    from sqlalchemy import event
+
+    from oneday import create_app, db
+    from bench.seed import seed
+
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False)
+    counter = QueryCounter()
+
+    with app.app_context():
+        if not os.path.exists(marker):
+            upgrade(directory=os.path.join(os.path.dirname(HERE), "migrations"))
+            seed(**counts, seed_value=args.seed)
+            with open(marker, "w") as f:
+                json.dump(wanted, f)
+        event.listen(db.engine, "after_cursor_execute", counter)
+        ctx = build_context(db, args.scale)
+
+    result = {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "counts": counts,
+            "requests": args.requests,
+            "mix_seconds": args.mix,
+            "threads": args.threads,
+        },
+        "scenarios": {},
+    }
+
+    if args.mix:
+        result["scenarios"] = run_mix(app, counter, ctx, args.mix, args.threads, args.seed)
+    else:
+        only = set(args.only.split(",")) if args.only else None
+        for name, _, login, func in SCENARIOS:
+            if only and name not in only:
+                continue
+            rng = random.Random(f"{args.seed}:{name}")
+            stats = run_scenario(app, counter, ctx, func, login, args.requests, args.warmup, rng)
+            result["scenarios"][name] = stats
+            print(f"{name:18} p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+                  f"p99 {stats['p99_ms']:8.2f}ms  {stats['throughput_rps']:8.1f} req/s  "
+                  f"{stats['queries_per_request']:6.2f} q/req  {stats['statuses']}")
+
+    out = args.out or os.path.join(
+        HERE, "results", f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{result['meta']['revision'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""합성 데이터 대량 입력. ORM 객체 대신 Core insert + executemany 로 청크 단위 입력한다."""
+import datetime
+import random
+import time
+
+from sqlalchemy import insert, text
+from werkzeug.security import generate_password_hash
+
+SCALES = {
+    # 이름: (users, questions, answers, courses, reservations)
+    "tiny": (200, 2_000, 6_000, 200, 5_000),
+    "small": (2_000, 20_000, 100_000, 1_000, 50_000),
+    "large": (20_000, 100_000, 1_000_000, 10_000, 500_000),
+}
+
+CHUNK = 10_000
+PASSWORD = "bench-password"
+SESSIONS_PER_COURSE = 5
+
+WORDS = ("도자기 클래스 예약 환불 주말 평일 재료비 주차 공방 향수 베이킹 꽃꽂이 "
+         "가죽 목공 캔들 시간 변경 인원 추가 단체 문의 후기 강사 위치 준비물").split()
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _chunked_insert(model, rows):
+    from oneday import db
+
+    for i in range(0, len(rows), CHUNK):
+        db.session.execute(insert(model), rows[i:i + CHUNK])
+        db.session.commit()
+
+
+def seed(users, questions, answers, courses, reservations, seed_value=42, echo=print):
+    """빈 DB 에 합성 데이터를 넣는다. 같은 seed_value 면 같은 데이터가 나온다."""
+    # oneday 는 config 를 import 시점에 읽으므로, bench.run 이 DATABASE_URL 을 정한 뒤에 가져온다
+    from oneday import booking, db, search
+    from oneday.models import Answer, ClassSession, Course, CourseImage, Question, Reservation, User
+
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+    now = datetime.datetime(2026, 1, 1)
+
+    # FTS 트리거는 행마다 답변을 다시 이어 붙이므로 끄고 넣은 뒤 한 번에 색인한다
+    sqlite = db.engine.dialect.name == "sqlite"
+    if sqlite:
+        for name in ("question_fts_ai", "question_fts_au", "question_fts_ad",
+                     "answer_fts_ai", "answer_fts_au", "answer_fts_ad"):
+            db.session.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        db.session.commit()
+
+    password = generate_password_hash(PASSWORD)
+    _chunked_insert(User, [
+        {"id": i, "username": f"bench{i}", "email": f"bench{i}@example.com", "password": password}
+        for i in range(1, users + 1)
+    ])
+    echo(f"users {users}")
+
+    # 답변 수는 일부 질문에 몰리게 (인기 글)
+    per_question = [0] * (questions + 1)
+    for _ in range(answers):
+        per_question[min(int(rng.paretovariate(1.2)), questions)] += 1
+    rng.shuffle(per_question)
+    _chunked_insert(Question, [
+        {"id": i, "subject": _sentence(rng, 4), "content": _sentence(rng, 30),
+         "create_date": now - datetime.timedelta(minutes=questions - i),
+         "user_id": rng.randint(1, users), "answer_count": per_question[i]}
+        for i in range(1, questions + 1)
+    ])
+    echo(f"questions {questions}")
+
+    rows = []
+    for qid in range(1, questions + 1):
+        for _ in range(per_question[qid]):
+            rows.append({"content": _sentence(rng, 15), "question_id": qid,
+                         "user_id": rng.randint(1, users),
+                         "create_date": now - datetime.timedelta(minutes=questions - qid - 1)})
+            if len(rows) >= CHUNK:
+                _chunked_insert(Answer, rows)
+                rows = []
+    _chunked_insert(Answer, rows)
+    echo(f"answers {sum(per_question)}")
+
+    # 마이그레이션이 넣은 클래스 페이지 코스 뒤에 이어 붙인다
+    first = db.session.scalar(db.select(db.func.max(Course.id))) or 0
+    _chunked_insert(Course, [
+        {"id": first + i, "classid": f"bench-{i}", "description": _sentence(rng, 20),
+         "price": rng.randrange(10_000, 200_000, 1000), "duration_minutes": rng.choice((60, 90, 120, 180)),
+         "is_published": rng.random() < 0.8, "created_at": now - datetime.timedelta(hours=courses - i)}
+        for i in range(1, courses + 1)
+    ])
+    _chunked_insert(CourseImage, [
+        {"course_id": first + i, "path": f"courses/bench-{i}-{k}.jpg"}
+        for i in range(1, courses + 1) for k in range(2)
+    ])
+    echo(f"courses {courses}")
+
+    # 회차당 예약 수를 먼저 정하고, (회차, 사용자) 가 겹치지 않게 사용자를 배정한다
+    n_sessions = courses * SESSIONS_PER_COURSE
+    taken = [0] * (n_sessions + 1)
+    rows = []
+    for k in range(reservations):
+        session_id = k % n_sessions + 1
+        user_id = (k // n_sessions) % users + 1
+        if k // n_sessions >= users:
+            break
+        taken[session_id] += 1
+        rows.append({"session_id": session_id, "user_id": user_id})
+    session_rows = []
+    for sid in range(1, n_sessions + 1):
+        course_id = first + (sid - 1) // SESSIONS_PER_COURSE + 1
+        day = now + datetime.timedelta(days=(sid % 60), hours=10 + sid % 8)
+        session_rows.append({"id": sid, "course_id": course_id, "starts_at": day,
+                             "capacity": max(taken[sid], 20), "seats_taken": taken[sid]})
+    _chunked_insert(ClassSession, session_rows)
+    starts = {r["id"]: r for r in session_rows}
+    _chunked_insert(Reservation, [
+        {"user_id": r["user_id"], "session_id": r["session_id"],
+         "class_name": f"bench-{starts[r['session_id']]['course_id']}",
+         "reserved_date": starts[r["session_id"]]["starts_at"].date(),
+         "reserved_time": starts[r["session_id"]]["starts_at"].strftime("%H:%M"),
+         "status": booking.PENDING}
+        for r in rows
+    ])
+    booking.rebuild_occupancy()
+    echo(f"sessions {n_sessions}, reservations {len(rows)}")
+
+    if sqlite:
+        search.install(db.session.connection())
+        db.session.commit()
+        search.rebuild()
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+    echo(f"seeded in {time.perf_counter() - started:.1f}s")
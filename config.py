@@ -2,14 +2,130 @@ import os
 
 BASE_DIR = os.path.dirname(__file__)
 
-SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(BASE_DIR, 'oneday.db')}'
+# DATABASE_URL 로 PostgreSQL 등을 지정할 수 있고, 없으면 로컬 SQLite
+SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", f'sqlite:///{os.path.join(BASE_DIR, 'oneday.db')}')
+if SQLALCHEMY_DATABASE_URI.startswith("postgres://"):  # Heroku 형식 보정
+    SQLALCHEMY_DATABASE_URI = "postgresql://" + SQLALCHEMY_DATABASE_URI[len("postgres://"):]
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+if SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+    # SQLite 는 WAL/busy_timeout/synchronous 를 oneday.database 의 connect 이벤트에서 설정
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+else:
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),          # 워커(프로세스)당 연결 수
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),  # 프록시/방화벽 idle 끊김 대비
+        "pool_pre_ping": True,
+    }
+
 SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-me")
 
 WTF_CSRF_SECRET_KEY = os.environ.get("WTF_CSRF_SECRET_KEY", SECRET_KEY)  # (Flask-WTF 쓸 때)
 
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 MAX_CONTENT_LENGTH = 10 * 1024 * 1024
+# 업로드 화면의 파일은 받는 대로 디스크에 쓰고 (oneday.uploads.streamed_uploads) 파일마다 크기/개수를 제한한다
+UPLOAD_MAX_FILE_SIZE = int(os.environ.get("UPLOAD_MAX_FILE_SIZE", 5 * 1024 * 1024))
+UPLOAD_MAX_FILES = 5
 ALLOWED_EXTENSIONS = set(['png', 'jpg', 'jpeg', 'gif'])
+# 업로드 파일 전송: app(직접) / x-accel(nginx) / x-sendfile(apache 등)
+UPLOAD_SEND_MODE = os.environ.get("UPLOAD_SEND_MODE", "app")
+UPLOAD_ACCEL_PREFIX = os.environ.get("UPLOAD_ACCEL_PREFIX", "/_uploads/")  # nginx internal location
+USE_X_SENDFILE = UPLOAD_SEND_MODE == "x-sendfile"
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))  # 썸네일 생성 스레드 수
+# 업로드 저장소 (oneday.storage): local(UPLOAD_FOLDER) / s3 (boto3 필요) / s3-local (디렉터리로 흉내 낸 S3)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+S3_BUCKET = os.environ.get("S3_BUCKET")
+S3_PREFIX = os.environ.get("S3_PREFIX", "")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # MinIO/R2 등
+S3_REGION = os.environ.get("S3_REGION")
+STORAGE_S3_LOCAL_DIR = os.path.join(BASE_DIR, 's3-local')
+STORAGE_GC_GRACE = int(os.environ.get("STORAGE_GC_GRACE", 3600))  # 참조가 끊긴 뒤 이만큼(초) 지나야 `flask storage gc` 가 지운다
+
+# 화면 조각 캐시: memory(프로세스 내 LRU) / sqlite(CACHE_SQLITE_PATH 를 한 호스트의 워커들이 공유)
+# 또는 get/set/delete/clear 를 가진 클래스 경로
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_MAXSIZE = 256
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 60))
+SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else BASE_DIR  # 워커끼리 공유하는 SQLite 파일 위치 (메모리 파일시스템)
+CACHE_SQLITE_PATH = os.environ.get("CACHE_SQLITE_PATH", os.path.join(SHM_DIR, "oneday-cache.db"))
+# 로그인 사용자 캐시 (요청마다 user 테이블을 읽지 않는다): sqlite(워커 공유, 로그아웃이 바로 반영) / memory / cache(CACHE_BACKEND)
+USER_CACHE_BACKEND = os.environ.get("USER_CACHE_BACKEND", "sqlite")
+USER_CACHE_SQLITE_PATH = os.environ.get("USER_CACHE_SQLITE_PATH")  # 없으면 SHM_DIR 아래 DB 주소별 파일
+USER_CACHE_MAXSIZE = 1024
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", 60))
+
+# 비밀번호 해시: werkzeug 방식 문자열. 바꾸면 기존 사용자는 다음 로그인 때 새 설정으로 다시 저장된다
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", 0))               # 0 이면 요청 스레드에서 계산
+PASSWORD_MAX_CONCURRENT = int(os.environ.get("PASSWORD_MAX_CONCURRENT", 4))  # 워커 프로세스당 동시 해시 계산 수
+PASSWORD_WAIT_SECONDS = float(os.environ.get("PASSWORD_WAIT_SECONDS", 2))    # 자리가 안 나면 503
+
+# 응답 압축 (brotli 패키지가 있으면 br, 없으면 gzip). 이보다 작은 본문은 그대로 보낸다
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 500))
+COMPRESS_LEVEL = 6
+COMPRESS_BR_QUALITY = 5
+
+# 비로그인 전체 페이지 캐시 (홈/소개 페이지). PAGE_CACHE_DIR 을 주면 `flask pages prerender` 결과를 먼저 쓴다
+PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "1") == "1"
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR")
+PAGE_CACHE_MAXSIZE = 128
+PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL", 300))
+PAGE_CACHE_MAX_AGE = 60   # 브라우저/CDN 캐시 (Vary: Cookie)
+DEPLOY_ID = os.environ.get("DEPLOY_ID")  # 없으면 템플릿/정적 파일 해시
+
+# 컴파일된 Jinja 템플릿 바이트코드 위치 (`flask templates compile`), 시작 시 전부 미리 읽기
+JINJA_CACHE_DIR = os.environ.get("JINJA_CACHE_DIR", os.path.join(BASE_DIR, '.jinja_cache'))
+JINJA_PRELOAD = os.environ.get("JINJA_PRELOAD", "1") == "1"
+
+# 백그라운드 작업 (`flask jobs worker`): 예약 상태 전환과 수업 전 알림
+JOBS_POLL_SECONDS = float(os.environ.get("JOBS_POLL_SECONDS", 5))  # 할 일이 없을 때 큐를 다시 볼 간격
+JOBS_BATCH = 20                 # 한 번에 가져올 작업 수
+JOBS_MAX_ATTEMPTS = 5
+JOBS_LOCK_TIMEOUT = 600         # 이보다 오래 실행중이면 워커가 죽은 것으로 보고 다시 큐에
+JOBS_CHUNK_SIZE = 500           # 상태 전환 UPDATE 한 번에 바꿀 예약 수
+JOBS_CHUNK_PAUSE = 0.05         # chunk 사이 쉬는 초 (그동안 예약 요청의 쓰기가 들어온다)
+JOBS_RESERVATION_INTERVAL = int(os.environ.get("JOBS_RESERVATION_INTERVAL", 300))
+RESERVATION_CONFIRM_DAYS = 2    # 회차 예약은 수업 이틀 전부터 확정
+REMINDER_DAYS_BEFORE = 1
+# 알림: log / outbox(NOTIFICATION_OUTBOX 에 JSON Lines) / send(message) 를 가진 클래스 경로
+NOTIFICATION_SINK = os.environ.get("NOTIFICATION_SINK", "log")
+NOTIFICATION_OUTBOX = os.environ.get("NOTIFICATION_OUTBOX", os.path.join(BASE_DIR, 'outbox', 'notifications.jsonl'))
+
+# 요청 수 제한 (oneday.ratelimit). 'N/second|minute|hour|day': N 번까지 몰아서, 그 뒤로는 기간당 N 번 (token bucket)
+RATELIMIT_ENABLED = os.environ.get("RATELIMIT_ENABLED", "1") == "1"
+# memory(워커 프로세스별) / sqlite(RATELIMIT_SQLITE_PATH 를 한 호스트의 워커들이 공유) / take(buckets, now), acquire, release 를 가진 클래스 경로
+RATELIMIT_BACKEND = os.environ.get("RATELIMIT_BACKEND", "memory")
+RATELIMIT_SQLITE_PATH = os.environ.get(
+    "RATELIMIT_SQLITE_PATH",
+    "/dev/shm/oneday-ratelimit.db" if os.path.isdir("/dev/shm") else os.path.join(BASE_DIR, 'ratelimit.db'),
+)
+RATELIMIT_METHODS = ("POST",)   # 화면(GET)은 세지 않는다
+# 엔드포인트 -> {키 종류: 한도}. 키 종류는 ip / user(로그인 사용자) / form:<필드> (멀티파트 업로드 화면에는 쓰지 않는다)
+RATELIMIT_RULES = {
+    "auth.login": {"ip": "20/minute", "form:username": "5/minute"},
+    "auth.signup": {"ip": "5/hour"},
+    "answer.create": {"ip": "30/minute", "user": "10/minute"},
+    "question.create": {"ip": "20/minute", "user": "5/minute"},
+    "reservations.reservation_form": {"ip": "30/minute", "user": "10/minute"},
+}
+# 비싼 엔드포인트(비밀번호 해시, 업로드)의 동시 처리 수. 자리가 ADMISSION_WAIT_SECONDS 안에 안 나면 429
+ADMISSION_ENDPOINTS = ("auth.login", "auth.signup", "question.create")
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", 16))  # memory 면 워커 프로세스당, sqlite 면 호스트 전체
+ADMISSION_WAIT_SECONDS = 0.5
+ADMISSION_LEASE_SECONDS = 60    # 워커가 죽어 반납 못 한 자리가 풀리는 시간 (sqlite)
+# 앞단 프록시(nginx/로드밸런서) 수. 0 보다 크면 X-Forwarded-For 로 클라이언트 IP 를 정한다
+PROXY_COUNT = int(os.environ.get("PROXY_COUNT", 0))
+
+# 요청/SQL 계측 (Server-Timing 헤더, /metrics, N+1 경고). 기본은 꺼짐
+INSTRUMENTATION_ENABLED = os.environ.get("INSTRUMENTATION_ENABLED") == "1"
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 10))  # 한 요청에서 같은 쿼리 반복 횟수
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))   # 0.01 이면 요청 1% 프로파일링
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")                         # X-Profile 헤더 값이 같으면 프로파일링
+# /metrics 는 'Authorization: Bearer <PROFILE_TOKEN>' 이나 아래 IP 에서만 (쉼표 구분, PROXY_COUNT 반영한 클라이언트 IP)
+METRICS_ALLOW_IPS = [ip.strip() for ip in os.environ.get("METRICS_ALLOW_IPS", "").split(",") if ip.strip()]
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
 # SECRET_KEY = "dev"
@@ -0,0 +1,35 @@
+# gunicorn 설정. 값은 환경변수로 덮어쓸 수 있다.
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+# 워커: CPU 당 2개 + 1 (I/O 대기 동안 다른 워커가 처리), 워커마다 스레드 몇 개
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# 마스터에서 앱을 한 번 import 하고 fork -> 코드/템플릿 메모리를 copy-on-write 로 공유.
+# preload 상태에서 코드 교체는 HUP 이 아니라 USR2(새 마스터) + 기존 마스터 WINCH/QUIT 로 한다.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+# 메모리 누수/단편화 대비 워커 재시작. jitter 로 워커들이 한꺼번에 재시작하지 않게 한다.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))  # 앞단 프록시의 keepalive 보다 길게
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+
+def post_fork(server, worker):
+    # preload 시 마스터에서 만든 커넥션 풀을 자식이 공유하지 않도록 버린다
+    from oneday import db
+    from wsgi import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
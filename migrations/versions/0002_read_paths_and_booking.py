@@ -0,0 +1,153 @@
+"""answer counts, list indexes, image variants, FTS search, class sessions
+
+Revision ID: 0002_read_paths_and_booking
+Revises: 0001_baseline
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_read_paths_and_booking'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+# oneday/search.py 의 FTS_DDL 과 같은 내용 (마이그레이션은 앱 코드에 의존하지 않도록 복사)
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS question_fts
+    USING fts5(subject, content, answers, tokenize='trigram')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS question_fts_ai AFTER INSERT ON question BEGIN
+        INSERT INTO question_fts(rowid, subject, content, answers)
+        VALUES (new.id, new.subject, new.content, '');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS question_fts_au AFTER UPDATE OF subject, content ON question BEGIN
+        UPDATE question_fts SET subject = new.subject, content = new.content WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS question_fts_ad AFTER DELETE ON question BEGIN
+        DELETE FROM question_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS answer_fts_ai AFTER INSERT ON answer BEGIN
+        UPDATE question_fts SET answers = (
+            SELECT group_concat(content, char(10)) FROM answer WHERE question_id = new.question_id
+        ) WHERE rowid = new.question_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS answer_fts_au AFTER UPDATE OF content ON answer BEGIN
+        UPDATE question_fts SET answers = (
+            SELECT group_concat(content, char(10)) FROM answer WHERE question_id = new.question_id
+        ) WHERE rowid = new.question_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS answer_fts_ad AFTER DELETE ON answer BEGIN
+        UPDATE question_fts SET answers = coalesce((
+            SELECT group_concat(content, char(10)) FROM answer WHERE question_id = old.question_id
+        ), '') WHERE rowid = old.question_id;
+    END
+    """,
+]
+
+
+def upgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thumb_path', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('medium_path', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('answer_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_question_create_date_id', ['create_date', 'id'], unique=False)
+
+    op.execute(
+        "UPDATE question SET answer_count = "
+        "(SELECT count(answer.id) FROM answer WHERE answer.question_id = question.id)"
+    )
+
+    with op.batch_alter_table('course_image', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thumb_path', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('medium_path', sa.String(length=200), nullable=True))
+
+    with op.batch_alter_table('course', schema=None) as batch_op:
+        batch_op.create_index('ix_course_price', ['price', 'id'], unique=False)
+        batch_op.create_index('ix_course_published_created', ['is_published', 'created_at', 'id'], unique=False)
+
+    op.create_table('class_session',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('starts_at', sa.DateTime(), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('seats_taken', sa.Integer(), server_default='0', nullable=False),
+    sa.CheckConstraint('seats_taken >= 0 AND seats_taken <= capacity', name='ck_class_session_seats'),
+    sa.ForeignKeyConstraint(['course_id'], ['course.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('class_session', schema=None) as batch_op:
+        batch_op.create_index('ix_class_session_course_starts', ['course_id', 'starts_at'], unique=False)
+
+    op.create_table('course_day_occupancy',
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('capacity', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('seats_taken', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['course.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('course_id', 'day')
+    )
+
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('session_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_reservations_session_id', 'class_session', ['session_id'], ['id'],
+                                    ondelete='SET NULL')
+        batch_op.create_unique_constraint('uq_reservation_session_user', ['session_id', 'user_id'])
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for ddl in FTS_DDL:
+            op.execute(ddl)
+        op.execute("""
+            INSERT INTO question_fts(rowid, subject, content, answers)
+            SELECT q.id, q.subject, q.content, coalesce((
+                SELECT group_concat(a.content, char(10)) FROM answer a WHERE a.question_id = q.id
+            ), '')
+            FROM question q
+        """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for name in ('question_fts_ai', 'question_fts_au', 'question_fts_ad',
+                     'answer_fts_ai', 'answer_fts_au', 'answer_fts_ad'):
+            op.execute(f'DROP TRIGGER IF EXISTS {name}')
+        op.execute('DROP TABLE IF EXISTS question_fts')
+
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_reservation_session_user', type_='unique')
+        batch_op.drop_constraint('fk_reservations_session_id', type_='foreignkey')
+        batch_op.drop_column('session_id')
+
+    op.drop_table('course_day_occupancy')
+    with op.batch_alter_table('class_session', schema=None) as batch_op:
+        batch_op.drop_index('ix_class_session_course_starts')
+
+    op.drop_table('class_session')
+    with op.batch_alter_table('course', schema=None) as batch_op:
+        batch_op.drop_index('ix_course_published_created')
+        batch_op.drop_index('ix_course_price')
+
+    with op.batch_alter_table('course_image', schema=None) as batch_op:
+        batch_op.drop_column('medium_path')
+        batch_op.drop_column('thumb_path')
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_index('ix_question_create_date_id')
+        batch_op.drop_column('answer_count')
+        batch_op.drop_column('medium_path')
+        batch_op.drop_column('thumb_path')
@@ -0,0 +1,25 @@
+"""answer (question_id, create_date, id) index for paginated question detail
+
+Revision ID: 0003_answer_page_index
+Revises: 0002_read_paths_and_booking
+Create Date: 2026-10-18 14:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_answer_page_index'
+down_revision = '0002_read_paths_and_booking'
+branch_labels = None
+depends_on = None
+
+
+# batch_alter_table 을 쓰면 SQLite 에서 answer 테이블이 다시 만들어지며 FTS 트리거가 사라지므로
+# 인덱스만 직접 만든다
+def upgrade():
+    op.create_index('ix_answer_question_create', 'answer', ['question_id', 'create_date', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_answer_question_create', table_name='answer')
@@ -0,0 +1,60 @@
+"""course slug/detail columns and the former about pages as course rows
+
+Revision ID: 0005_class_pages
+Revises: 0004_user_session_version
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+import json
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_class_pages'
+down_revision = '0004_user_session_version'
+branch_labels = None
+depends_on = None
+
+# about.html ~ about8.html 에 하드코딩돼 있던 내용
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'class_pages.json')
+
+
+def upgrade():
+    op.add_column('course', sa.Column('slug', sa.String(length=80), nullable=True))
+    op.add_column('course', sa.Column('title', sa.String(length=200), nullable=True))
+    op.add_column('course', sa.Column('cover_url', sa.String(length=500), nullable=True))
+    op.add_column('course', sa.Column('lead_days', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('course', sa.Column('details', sa.JSON(), nullable=True))
+    op.create_index('ix_course_slug', 'course', ['slug'], unique=True)
+
+    course = sa.table(
+        'course',
+        sa.column('classid', sa.String), sa.column('slug', sa.String), sa.column('title', sa.String),
+        sa.column('description', sa.Text), sa.column('price', sa.Integer),
+        sa.column('duration_minutes', sa.Integer), sa.column('is_published', sa.Boolean),
+        sa.column('cover_url', sa.String), sa.column('lead_days', sa.Integer), sa.column('details', sa.JSON),
+    )
+    with open(DATA, encoding='utf-8') as f:
+        pages = json.load(f)
+    conn = op.get_bind()
+    existing = set(conn.execute(sa.select(course.c.classid)).scalars())
+    op.bulk_insert(course, [
+        dict({k: v for k, v in page.items() if k != 'legacy_page'}, is_published=True)
+        for page in pages if page['classid'] not in existing
+    ])
+
+
+def downgrade():
+    with open(DATA, encoding='utf-8') as f:
+        slugs = [page['slug'] for page in json.load(f)]
+    op.execute(sa.text('DELETE FROM course WHERE slug IN ({})'.format(', '.join(f"'{s}'" for s in slugs))))
+    op.drop_index('ix_course_slug', table_name='course')
+    with op.batch_alter_table('course', schema=None) as batch_op:
+        batch_op.drop_column('details')
+        batch_op.drop_column('lead_days')
+        batch_op.drop_column('cover_url')
+        batch_op.drop_column('title')
+        batch_op.drop_column('slug')
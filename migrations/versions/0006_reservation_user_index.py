@@ -0,0 +1,23 @@
+"""reservations (user_id, reserved_date, id) index for the paginated reservation list
+
+Revision ID: 0006_reservation_user_index
+Revises: 0005_class_pages
+Create Date: 2026-10-18 19:40:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_reservation_user_index'
+down_revision = '0005_class_pages'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_reservation_user_date', 'reservations', ['user_id', 'reserved_date', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_reservation_user_date', table_name='reservations')
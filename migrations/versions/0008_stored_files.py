@@ -0,0 +1,39 @@
+"""stored_file table and upload path indexes for content-addressed upload storage
+
+Revision ID: 0008_stored_files
+Revises: 0007_jobs
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_stored_files'
+down_revision = '0007_jobs'
+branch_labels = None
+depends_on = None
+
+
+# question 은 batch_alter_table 을 쓰면 FTS 트리거가 사라지므로 인덱스만 직접 만든다
+def upgrade():
+    op.create_table('stored_file',
+    sa.Column('key', sa.String(length=200), nullable=False),
+    sa.Column('refs', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('ix_stored_file_refs_updated', 'stored_file', ['refs', 'updated_at'], unique=False)
+    op.create_index('ix_course_image_path', 'course_image', ['path'], unique=False)
+    op.create_index('ix_course_main_image', 'course', ['image_path'], unique=False)
+    op.create_index('ix_question_image_path', 'question', ['image_path'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_question_image_path', table_name='question')
+    op.drop_index('ix_course_main_image', table_name='course')
+    op.drop_index('ix_course_image_path', table_name='course_image')
+    op.drop_index('ix_stored_file_refs_updated', table_name='stored_file')
+    op.drop_table('stored_file')
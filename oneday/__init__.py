@@ -2,6 +2,7 @@ from flask import Flask
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 import config
 import os
 
@@ -18,19 +19,34 @@ def create_app():
 
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+    if app.config.get('PROXY_COUNT'):
+        # 요청 수 제한이 프록시가 아니라 클라이언트 IP 로 세도록
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_COUNT'], x_proto=app.config['PROXY_COUNT'])
+
     # 확장 초기화
     db.init_app(app)
     migrate.init_app(app, db)
-    from . import models
+    from . import models, search, database
+    database.init_app(app)
 
 
     login_manager.init_app(app)
 
+    from . import cache, identity, passwords
+    cache.init_app(app)
+    identity.init_app(app)
+    passwords.init_app(app)
+
+    login_manager.user_loader(identity.load_user)
 
-    from .models import User
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    # 한도를 넘은 요청은 다른 before_request 훅(DB/캐시)보다 먼저 끊는다
+    from . import ratelimit
+    ratelimit.init_app(app)
+
+    # 압축/ETag 는 다른 after_request 훅보다 늦게 돌아야 하므로 먼저 등록
+    from . import responses, pagecache
+    responses.init_app(app)
+    pagecache.init_app(app)
 
     # 블루프린트 등록
     from .views import (
@@ -45,10 +61,22 @@ def create_app():
     app.register_blueprint(reservation_views.bp)
     app.register_blueprint(sub_views.bp)
 
+    from . import images, jobs, storage, uploads
+    app.cli.add_command(images.cli)
+    storage.init_app(app)
+    uploads.init_app(app)
+    jobs.init_app(app)
+
     from .filter import format_datetime
     app.jinja_env.filters['datetime'] = format_datetime
 
-    with app.app_context():
-        db.create_all()
-        
+    from .uploads import upload_url
+    app.jinja_env.globals['upload_url'] = upload_url
+
+    from . import templating
+    templating.init_app(app)
+
+    from . import instrumentation
+    instrumentation.init_app(app)
+
     return app
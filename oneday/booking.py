@@ -0,0 +1,250 @@
+import datetime
+import random
+import time
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from oneday import db
+from oneday.models import ClassSession, DayOccupancy, Reservation
+
+PENDING = "대기중"
+CONFIRMED = "확정"
+COMPLETED = "완료"
+EXPIRED = "만료"
+
+# SQLite 는 쓰기가 직렬화되므로 "database is locked" 가 나면 잠깐 쉬고 다시 시도한다
+LOCK_RETRIES = 5
+
+
+class BookingError(Exception):
+    """예약할 수 없는 경우. 메시지는 그대로 사용자에게 보여준다."""
+
+
+def _retry_locked(fn):
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return fn()
+        except OperationalError as e:
+            db.session.rollback()
+            if "locked" not in str(e.orig) or attempt == LOCK_RETRIES - 1:
+                raise
+            time.sleep(0.01 * 2 ** attempt + random.random() * 0.01)
+
+
+def add_day_capacity(course_id, day, capacity=0, seats_taken=0):
+    """course_day_occupancy 행을 없으면 만들고 있으면 더한다 (commit 은 호출한 쪽에서)."""
+    dialect = postgresql if db.engine.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(DayOccupancy).values(
+        course_id=course_id, day=day, capacity=capacity, seats_taken=seats_taken
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[DayOccupancy.course_id, DayOccupancy.day],
+        set_={
+            "capacity": DayOccupancy.capacity + stmt.excluded.capacity,
+            "seats_taken": DayOccupancy.seats_taken + stmt.excluded.seats_taken,
+        },
+    ))
+
+
+def _change_day_seats(session, delta):
+    db.session.execute(
+        update(DayOccupancy)
+        .where(DayOccupancy.course_id == session.course_id,
+               DayOccupancy.day == session.starts_at.date())
+        .values(seats_taken=DayOccupancy.seats_taken + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _take_seat(session):
+    """남은 좌석이 있을 때만 seats_taken 을 1 늘린다.
+
+    WHERE 조건과 증가가 한 문장이라 동시에 여러 요청이 와도 capacity 를 넘지 않는다
+    (PostgreSQL 은 행 잠금 후 조건을 다시 평가, SQLite 는 쓰기 직렬화).
+    """
+    result = db.session.execute(
+        update(ClassSession)
+        .where(ClassSession.id == session.id, ClassSession.seats_taken < ClassSession.capacity)
+        .values(seats_taken=ClassSession.seats_taken + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    _change_day_seats(session, 1)
+    return True
+
+
+def _release_seat(session):
+    result = db.session.execute(
+        update(ClassSession)
+        .where(ClassSession.id == session.id, ClassSession.seats_taken > 0)
+        .values(seats_taken=ClassSession.seats_taken - 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 1:
+        _change_day_seats(session, -1)
+
+
+def add_session(course_id, starts_at, capacity):
+    """회차를 만들고 그날의 정원 합계에 더한다."""
+    session = ClassSession(course_id=course_id, starts_at=starts_at, capacity=capacity)
+    db.session.add(session)
+    add_day_capacity(course_id, starts_at.date(), capacity=capacity)
+    db.session.commit()
+    return session
+
+
+def rebuild_occupancy():
+    """class_session 에서 course_day_occupancy 를 다시 계산한다. 반환값은 행 수."""
+    day = func.date(ClassSession.starts_at)
+    rows = db.session.execute(
+        db.select(ClassSession.course_id, day, func.sum(ClassSession.capacity),
+                  func.sum(ClassSession.seats_taken))
+        .group_by(ClassSession.course_id, day)
+    ).all()
+    db.session.execute(db.delete(DayOccupancy))
+    db.session.add_all([
+        DayOccupancy(course_id=course_id,
+                     day=d if isinstance(d, datetime.date) else datetime.date.fromisoformat(d),
+                     capacity=capacity, seats_taken=taken)
+        for course_id, d, capacity, taken in rows
+    ])
+    db.session.commit()
+    return len(rows)
+
+
+def _fill_from_session(reservation, session):
+    reservation.session_id = session.id
+    reservation.class_name = session.course.classid
+    reservation.reserved_date = session.starts_at.date()
+    reservation.reserved_time = session.starts_at.strftime("%H:%M")
+
+
+def book(session_id, user_id):
+    """회차 좌석 하나를 잡고 Reservation 을 만든다. 실패하면 BookingError."""
+    def attempt():
+        session = db.session.get(ClassSession, session_id)
+        if session is None:
+            raise BookingError("존재하지 않는 회차입니다.")
+        if not _take_seat(session):
+            db.session.rollback()
+            raise BookingError("마감된 회차입니다.")
+        reservation = Reservation(user_id=user_id, status=PENDING)
+        _fill_from_session(reservation, session)
+        db.session.add(reservation)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # 좌석 증가도 같이 취소된다
+            raise BookingError("이미 예약한 회차입니다.")
+        return reservation
+
+    return _retry_locked(attempt)
+
+
+def move(reservation, session_id):
+    """예약을 다른 회차로 옮긴다. 새 좌석 확보와 기존 좌석 반환이 한 트랜잭션."""
+    if reservation.session_id == session_id:
+        return reservation
+    reservation_id = reservation.id
+
+    def attempt():
+        target = db.session.get(Reservation, reservation_id)
+        session = db.session.get(ClassSession, session_id)
+        if session is None:
+            raise BookingError("존재하지 않는 회차입니다.")
+        if not _take_seat(session):
+            db.session.rollback()
+            raise BookingError("마감된 회차입니다.")
+        if target.session:
+            _release_seat(target.session)
+        _fill_from_session(target, session)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise BookingError("이미 예약한 회차입니다.")
+        return target
+
+    return _retry_locked(attempt)
+
+
+def cancel(reservation):
+    """예약을 지우고 회차 좌석을 돌려준다."""
+    reservation_id = reservation.id
+
+    def attempt():
+        target = db.session.get(Reservation, reservation_id)
+        if target.session:
+            _release_seat(target.session)
+        db.session.delete(target)
+        db.session.commit()
+
+    _retry_locked(attempt)
+
+
+def _transition_chunks(where, status, chunk_size, pause):
+    """where 에 맞는 예약을 chunk_size 건씩 status 로 바꾼다. 반환값은 바뀐 행 수.
+
+    한 번에 전부 바꾸면 SQLite 에서는 그동안 예약 요청의 쓰기가 모두 기다려야 하므로
+    작은 UPDATE 여러 번으로 나누고 사이사이 커밋한다.
+    """
+    changed = 0
+    while True:
+        ids = db.select(Reservation.id).where(*where).order_by(Reservation.id).limit(chunk_size)
+        stmt = (
+            update(Reservation)
+            .where(Reservation.id.in_(ids), *where)  # 다른 워커가 먼저 바꾼 행은 건너뛴다
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+
+        def attempt():
+            result = db.session.execute(stmt)
+            db.session.commit()
+            return result.rowcount
+
+        count = _retry_locked(attempt)
+        changed += count
+        if count < chunk_size:
+            return changed
+        if pause:
+            time.sleep(pause)
+
+
+def advance_statuses(today=None, confirm_days=2, chunk_size=500, pause=0.0):
+    """예약 상태를 날짜에 맞게 한 단계씩 넘긴다. 반환값은 {새 상태: 바뀐 수}.
+
+    - 회차 예약(좌석 확보됨)은 수업 confirm_days 일 전부터 확정
+    - 확정된 예약은 수업 날짜가 지나면 완료
+    - 좌석 없는 자유 입력 예약이 대기중인 채로 날짜가 지나면 만료
+    """
+    today = today or datetime.date.today()
+    return {
+        CONFIRMED: _transition_chunks(
+            (Reservation.status == PENDING, Reservation.session_id.isnot(None),
+             Reservation.reserved_date < today + datetime.timedelta(days=confirm_days)),
+            CONFIRMED, chunk_size, pause),
+        COMPLETED: _transition_chunks(
+            (Reservation.status == CONFIRMED, Reservation.reserved_date < today),
+            COMPLETED, chunk_size, pause),
+        EXPIRED: _transition_chunks(
+            (Reservation.status == PENDING, Reservation.session_id.is_(None),
+             Reservation.reserved_date < today),
+            EXPIRED, chunk_size, pause),
+    }
+
+
+def upcoming_confirmed(today, days_before, after_id=0, limit=500):
+    """오늘 다음날부터 days_before 일 뒤까지의 확정 예약 (id, reserved_date). 알림 예약용, id 순 keyset."""
+    return db.session.execute(
+        db.select(Reservation.id, Reservation.reserved_date)
+        .where(Reservation.status == CONFIRMED,
+               Reservation.reserved_date > today,
+               Reservation.reserved_date <= today + datetime.timedelta(days=days_before),
+               Reservation.id > after_id)
+        .order_by(Reservation.id)
+        .limit(limit)
+    ).all()
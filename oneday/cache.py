@@ -0,0 +1,142 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import current_app
+from werkzeug.utils import import_string
+
+
+class TTLCache:
+    """프로세스 안에서만 쓰는 LRU + TTL 캐시.
+
+    gunicorn 워커마다 따로 존재하므로, 다른 워커의 무효화는 TTL 이 지나야 반영된다.
+    워커 간에 공유해야 하면 CACHE_BACKEND 를 sqlite 로 하거나 같은 인터페이스(get/set/delete/clear)를
+    가진 클래스의 import 경로를 지정한다.
+    """
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            expires, value = hit
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        # ttl=None 이면 기본값, ttl=0 이면 만료 없이 LRU 로만 밀려난다
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache:
+    """같은 호스트의 gunicorn 워커들이 같이 쓰는 캐시 (CACHE_SQLITE_PATH 파일 하나).
+
+    /dev/shm 에 두면 디스크를 타지 않는다. delete() 가 모든 워커에 바로 보이므로
+    무효화를 TTL 까지 기다리지 않는다. 값은 JSON 으로 저장한다 (튜플은 리스트로 돌아온다).
+    """
+
+    def __init__(self, path, maxsize=256, ttl=60):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+
+    def _conn(self):
+        # 스레드마다, 그리고 fork 뒤에는 새 연결 (preload 된 마스터의 연결을 물려받지 않게)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')  # 잃어도 되는 값
+            conn.execute('CREATE TABLE IF NOT EXISTS cache '
+                         '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, stored REAL NOT NULL)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            'INSERT INTO cache (key, value, expires, stored) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, stored = excluded.stored',
+            (key, json.dumps(value), now + ttl if ttl else None, now),
+        )
+        if random.random() < 0.01:  # 가끔 만료된 것과 maxsize 를 넘는 오래된 것을 지운다
+            conn.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+            conn.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY stored DESC LIMIT -1 OFFSET ?)',
+                         (self.maxsize,))
+
+    def delete(self, key):
+        self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._conn().execute('DELETE FROM cache')
+
+
+def init_app(app):
+    backend = app.config.get('CACHE_BACKEND', 'memory')
+    if backend == 'memory':
+        cache = TTLCache(app.config.get('CACHE_MAXSIZE', 256), app.config.get('CACHE_TTL', 60))
+    elif backend == 'sqlite':
+        cache = SQLiteCache(app.config['CACHE_SQLITE_PATH'], app.config.get('CACHE_MAXSIZE', 256),
+                            app.config.get('CACHE_TTL', 60))
+    else:
+        cache = import_string(backend)(app.config)
+    app.extensions['oneday_cache'] = cache
+
+
+def get_cache():
+    return current_app.extensions['oneday_cache']
+
+
+def namespace(name):
+    """name 묶음의 현재 세대 토큰. 키 앞에 붙여 두면 bump() 한 번으로 전부 무효화된다.
+
+    토큰이 LRU 에서 밀려나도 새 토큰이 만들어질 뿐이라 예전 키가 되살아나지 않는다.
+    """
+    cache = get_cache()
+    key = f'ns:{name}'
+    token = cache.get(key)
+    if token is None:
+        token = uuid.uuid4().hex
+        cache.set(key, token, ttl=0)
+    return token
+
+
+def bump(name):
+    get_cache().set(f'ns:{name}', uuid.uuid4().hex, ttl=0)
@@ -0,0 +1,370 @@
+"""코스 대량 가져오기/내보내기 (flask course import / export).
+
+CSV 는 images 를 '|' 로, details 를 JSON 문자열로 담는다. JSONL 은 한 줄에 코스 하나.
+"""
+import csv
+import json
+import os
+import re
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from html.parser import HTMLParser
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import selectinload
+
+from oneday import db, storage
+from oneday.models import Course, CourseImage
+
+FIELDS = ("classid", "title", "slug", "description", "price", "duration_minutes", "is_published",
+          "lead_days", "cover_url", "details", "images")
+DOWNLOAD_TIMEOUT = 30
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+
+
+# details 는 클래스 화면에 |safe 로 들어가므로 가져올 때 이 태그/속성만 남긴다
+ALLOWED_TAGS = {"a", "b", "br", "div", "em", "h1", "h2", "h3", "h4", "h5", "h6", "i", "img", "li", "ol",
+                "p", "span", "strong", "ul"}
+VOID_TAGS = {"br", "img"}
+ALLOWED_ATTRS = {"a": {"href"}, "img": {"src", "alt"}, "*": {"class", "style"}}
+SAFE_ATTR_VALUE = {"class": re.compile(r"[\w\s-]*"), "style": re.compile(r"[\w\s:;.,%#-]*")}  # url()/expression() 불가
+URL_SCHEMES = {"http", "https", "mailto"}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def _safe_url(value):
+    # 스킴이 있으면 http/https/mailto 만 (javascript:, data: 차단). 상대 경로와 #앵커는 그대로
+    scheme, colon, rest = re.sub(r"[\x00-\x20]", "", value).partition(":")
+    return not colon or "/" in scheme or "?" in scheme or "#" in scheme or scheme.lower() in URL_SCHEMES
+
+
+class _Sanitizer(HTMLParser):
+    """ALLOWED_TAGS 밖의 태그는 버리고 글자만 남긴다. script/style 은 내용째 버린다.
+
+    닫는 태그는 열린 것만 내보내고 끝에서 남은 것을 닫는다 (탭 div 밖으로 새지 않게).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out, self.open, self.skip = [], [], 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self.skip += 1
+        if self.skip or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRS.get(tag, set()) | ALLOWED_ATTRS["*"]
+        kept = []
+        for name, value in attrs:
+            value = value or ""
+            if name not in allowed:
+                continue
+            if name in ("href", "src") and not _safe_url(value):
+                continue
+            if name in SAFE_ATTR_VALUE and not SAFE_ATTR_VALUE[name].fullmatch(value):
+                continue
+            kept.append(f' {name}="{escape(value)}"')
+        self.out.append(f"<{tag}{''.join(kept)}>")
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in self.open[-1:] and tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self.skip = max(0, self.skip - 1)
+            return
+        if self.skip or tag not in self.open:
+            return
+        while self.open:
+            last = self.open.pop()
+            self.out.append(f"</{last}>")
+            if last == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.out.append(escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        return "".join(self.out) + "".join(f"</{tag}>" for tag in reversed(self.open))
+
+
+def sanitize_html(value):
+    parser = _Sanitizer()
+    parser.feed(value)
+    return parser.result()
+
+
+def guess_format(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def _read_rows(path, fmt):
+    """(줄 번호, dict) 를 하나씩 돌려준다. 파일 전체를 메모리에 올리지 않는다."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                row = {k: v for k, v in row.items() if k and v != ""}
+                if "images" in row:
+                    row["images"] = [p for p in row["images"].split("|") if p]
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError:
+                        yield number, None  # _clean 에서 건너뛴다
+
+
+def _clean(row):
+    """입력 한 줄을 Course 컬럼 값으로. 없는 컬럼은 건드리지 않도록 키를 만들지 않는다."""
+    if not isinstance(row, dict):
+        raise ImportRowError("JSON 객체가 아닙니다")
+    classid = str(row.get("classid") or "").strip()
+    if not 3 <= len(classid) <= 50:
+        raise ImportRowError("classid 는 3~50자여야 합니다")
+    values = {"classid": classid}
+    if "description" in row:
+        values["description"] = str(row["description"]).strip()
+    for name in ("title", "slug", "cover_url"):
+        if name in row:
+            values[name] = str(row[name]).strip() or None
+    for name, minimum in (("price", 0), ("duration_minutes", 5), ("lead_days", 0)):
+        if name in row:
+            try:
+                values[name] = int(row[name])
+            except (TypeError, ValueError):
+                raise ImportRowError(f"{name} 는 정수여야 합니다") from None
+            if values[name] < minimum:
+                raise ImportRowError(f"{name} 는 {minimum} 이상이어야 합니다")
+    if "is_published" in row:
+        published = row["is_published"]
+        values["is_published"] = published if isinstance(published, bool) else str(published).lower() in TRUE_VALUES
+    if "details" in row:
+        if isinstance(row["details"], str):  # CSV 는 JSON 문자열
+            try:
+                row["details"] = json.loads(row["details"])
+            except ValueError:
+                raise ImportRowError("details 가 올바른 JSON 이 아닙니다") from None
+        details = row["details"]
+        if details is not None:
+            if not isinstance(details, dict) or not all(isinstance(v, str) for v in details.values()):
+                raise ImportRowError("details 는 {탭 이름: HTML 문자열} 객체여야 합니다")
+            details = {str(name): sanitize_html(html) for name, html in details.items()}
+        values["details"] = details
+    return values, list(row.get("images") or [])
+
+
+class _ImageCopier:
+    """이미지를 업로드 저장소(oneday.storage)에 내용 해시 key 로 넣는다.
+
+    같은 내용은 같은 key 가 되므로 다시 가져와도 파일이 늘지 않는다.
+    UPLOAD_FOLDER 안에 이미 있는 파일(내보낸 파일을 다시 가져올 때)은 그 경로를 그대로 쓴다.
+    스레드에서 불리므로 저장소 백엔드는 만들 때 받아 둔다.
+    """
+
+    def __init__(self, upload_root, source_root):
+        self.upload_root = os.path.realpath(upload_root)
+        self.source_root = source_root
+        self.backend = storage.get_backend()
+
+    def __call__(self, source):
+        if source.startswith(("http://", "https://")):
+            name = os.path.basename(source.split("?", 1)[0]) or "image"
+            with urllib.request.urlopen(source, timeout=DOWNLOAD_TIMEOUT) as response:
+                return storage.put(response, name, self.backend, self.upload_root)
+
+        path = os.path.realpath(os.path.join(self.source_root, source))
+        if path.startswith(self.upload_root + os.sep):
+            return os.path.relpath(path, self.upload_root).replace("\\", "/")
+        with open(path, "rb") as f:
+            return storage.put(f, os.path.basename(path), self.backend, self.upload_root)
+
+
+def _upsert(rows):
+    """classid 기준 INSERT ... ON CONFLICT DO UPDATE. 반환값은 {classid: id}."""
+    dialect = postgresql if db.engine.dialect.name == "postgresql" else sqlite
+    ids = {}
+    # 한 문장의 VALUES 는 컬럼이 같아야 하므로 가진 컬럼 조합별로 나눈다
+    groups = {}
+    for values in rows:
+        groups.setdefault(tuple(sorted(values)), []).append(values)
+    for columns, group in groups.items():
+        if "description" not in columns:  # 기존 코스 갱신만 하는 줄: NOT NULL 을 채울 자리값
+            group = [dict(values, description="") for values in group]
+        stmt = dialect.insert(Course).values(group)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Course.classid],
+            set_={name: stmt.excluded[name] for name in columns if name != "classid"},
+        ).returning(Course.id, Course.classid)
+        ids.update({classid: course_id for course_id, classid in db.session.execute(stmt)})
+    return ids
+
+
+def _sync_images(ids, wanted):
+    """wanted = {course_id: [경로...]} 로 CourseImage 를 맞춘다. 그대로인 행은 썸네일째 남긴다."""
+    existing = {}
+    for image_id, course_id, path in db.session.execute(
+        db.select(CourseImage.id, CourseImage.course_id, CourseImage.path)
+        .where(CourseImage.course_id.in_(list(wanted)))
+    ):
+        existing.setdefault(course_id, {})[path] = image_id
+
+    stale, new, touched = [], [], set()
+    for course_id, paths in wanted.items():
+        have = existing.get(course_id, {})
+        for path, image_id in have.items():
+            if path not in paths:
+                stale.append(image_id)
+                touched.add(path)
+        new.extend({"course_id": course_id, "path": path} for path in paths if path not in have)
+        touched.update(paths)
+    if stale:
+        db.session.execute(db.delete(CourseImage).where(CourseImage.id.in_(stale)))
+    if new:
+        db.session.execute(db.insert(CourseImage), new)
+    # ORM flush 를 거치지 않으므로 참조 수는 직접 다시 센다
+    storage.recount(db.session.connection(), touched)
+    return len(new)
+
+
+def import_courses(path, fmt, images_from, chunk_size=500, workers=8, echo=print):
+    """파일을 chunk_size 줄씩 읽어 코스/이미지를 한 트랜잭션으로 넣는다. 반환값은 집계 dict."""
+    copier = _ImageCopier(current_app.config["UPLOAD_FOLDER"], images_from)
+    stats = {"rows": 0, "courses": 0, "images": 0, "skipped": 0}
+    started = time.perf_counter()
+    rows = _read_rows(path, fmt)
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="course-import") as pool:
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                break
+            stats["rows"] += len(batch)
+
+            cleaned = {}  # classid -> (values, images); 같은 classid 가 또 나오면 뒤의 것이 이긴다
+            for number, row in batch:
+                try:
+                    values, sources = _clean(row)
+                except ImportRowError as e:
+                    echo(f"{number}번째 줄 건너뜀: {e}")
+                    stats["skipped"] += 1
+                    continue
+                cleaned[values["classid"]] = (values, sources)
+
+            sources = sorted({s for _, images in cleaned.values() for s in images})
+            copied = {}
+            for source, result in zip(sources, pool.map(_safe_copy, [copier] * len(sources), sources)):
+                if isinstance(result, Exception):
+                    echo(f"이미지 복사 실패 {source}: {result}")
+                else:
+                    copied[source] = result
+
+            for values, images in cleaned.values():
+                paths = [copied[s] for s in images if s in copied]
+                if paths:
+                    values["image_path"] = paths[0]
+
+            # description 이 없는 줄은 기존 코스 갱신만 가능하다
+            partial = [c for c, (values, _) in cleaned.items() if "description" not in values]
+            if partial:
+                known = set(db.session.scalars(db.select(Course.classid).where(Course.classid.in_(partial))))
+                for classid in partial:
+                    if classid not in known:
+                        echo(f"{classid} 건너뜀: 새 코스에는 description 이 필요합니다")
+                        stats["skipped"] += 1
+                        del cleaned[classid]
+
+            stats["skipped"] += _drop_slug_conflicts(cleaned, echo)
+            ids = _upsert([values for values, _ in cleaned.values()])
+            wanted = {
+                ids[classid]: [copied[s] for s in images if s in copied]
+                for classid, (_, images) in cleaned.items() if images
+            }
+            stats["images"] += _sync_images(ids, wanted) if wanted else 0
+            db.session.commit()
+            stats["courses"] += len(ids)
+
+            elapsed = time.perf_counter() - started
+            echo(f"{stats['rows']}줄 처리, 코스 {stats['courses']}개, 새 이미지 {stats['images']}장 "
+                 f"({stats['rows'] / elapsed:.0f}줄/초)")
+    return stats
+
+
+def _drop_slug_conflicts(cleaned, echo):
+    """다른 코스(classid)가 이미 쓰는 slug 를 가진 줄은 건너뛴다 (UNIQUE 위반으로 chunk 전체가 실패하지 않게)."""
+    owners = {}
+    slugs = {values["slug"] for values, _ in cleaned.values() if values.get("slug")}
+    if slugs:
+        owners.update(db.session.execute(db.select(Course.slug, Course.classid).where(Course.slug.in_(slugs))).all())
+    skipped = 0
+    for classid, (values, _) in list(cleaned.items()):
+        slug = values.get("slug")
+        if not slug:
+            continue
+        owner = owners.setdefault(slug, classid)  # 같은 chunk 안에서는 먼저 나온 줄이 가진다
+        if owner != classid:
+            echo(f"{classid} 건너뜀: slug '{slug}' 는 {owner} 가 쓰고 있습니다")
+            del cleaned[classid]
+            skipped += 1
+    return skipped
+
+
+def _safe_copy(copier, source):
+    try:
+        return copier(source)
+    except (OSError, ValueError) as e:
+        return e
+
+
+def _export_row(course):
+    return {
+        "classid": course.classid,
+        "title": course.title,
+        "slug": course.slug,
+        "description": course.description,
+        "price": course.price,
+        "duration_minutes": course.duration_minutes,
+        "is_published": course.is_published,
+        "lead_days": course.lead_days,
+        "cover_url": course.cover_url,
+        "details": course.details,
+        "images": [img.path for img in course.images],
+    }
+
+
+def export_courses(out, fmt, batch_size=1000):
+    """코스를 batch_size 개씩 읽어 out 에 바로 쓴다. 반환값은 쓴 코스 수."""
+    stmt = (
+        db.select(Course).options(selectinload(Course.images)).order_by(Course.id)
+        .execution_options(yield_per=batch_size)
+    )
+    writer = csv.DictWriter(out, FIELDS) if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+    count = 0
+    for course in db.session.scalars(stmt):
+        row = _export_row(course)
+        if writer:
+            row["images"] = "|".join(row["images"])
+            row["details"] = json.dumps(row["details"], ensure_ascii=False) if row["details"] else ""
+            row["is_published"] = int(row["is_published"])
+            writer.writerow(row)
+        else:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        count += 1
+    return count
@@ -0,0 +1,23 @@
+from sqlalchemy import event
+
+from oneday import db
+
+
+def _sqlite_pragmas(busy_timeout_ms):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL: 읽기가 쓰기를 막지 않아 gunicorn 워커 여러 개에서도 "database is locked" 가 줄어든다
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        # WAL 에서는 NORMAL 이어도 손상 위험 없이 커밋마다 fsync 를 줄일 수 있다
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+    return on_connect
+
+
+def init_app(app):
+    """엔진 종류에 맞는 연결 설정을 건다. 스키마는 `flask db upgrade` 로 만든다."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _sqlite_pragmas(app.config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)))
@@ -4,14 +4,24 @@ from wtforms.fields.numeric import IntegerField
 from wtforms.fields.simple import StringField, TextAreaField, PasswordField, EmailField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Length, EqualTo, Email, NumberRange
 from flask_wtf.file import FileField, FileAllowed, FileRequired, MultipleFileField
-from wtforms.validators import Optional
+from wtforms.validators import Optional, ValidationError
 
+from oneday.uploads import upload_error
+
+
+class StagedUpload:
+    """oneday.uploads.streamed_uploads 가 받으면서 확인한 형식/크기 오류를 폼 오류로 보여 준다."""
+
+    def __call__(self, form, field):
+        error = upload_error(field.data if isinstance(field.data, list) else [field.data])
+        if error:
+            raise ValidationError(error)
 
 
 class QuestionForm(FlaskForm):
     subject = StringField('제목', validators=[DataRequired('제목은 필수입력 항목입니다.')])
     content = TextAreaField('내용', validators=[DataRequired('내용은 필수입력 항목입니다.')])
-    image = FileField('이미지 업로드', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif'], '이미지 파일만 업로드 가능합니다.')])
+    image = FileField('이미지 업로드', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif'], '이미지 파일만 업로드 가능합니다.'), StagedUpload()])
     submit = SubmitField('저장하기')
 
 class AnswerForm(FlaskForm):
@@ -33,9 +43,9 @@ class CourseCreateForm(FlaskForm):
     price = IntegerField("가격", validators=[DataRequired(),NumberRange(min=0) ],default=0)
     duration_minutes = IntegerField("소요시간", validators=[NumberRange(min=5)], default=60)
     is_published = BooleanField("등록 완료 여부")
-    image = FileField('이미지 업로드', validators=[FileRequired(message="대표 이미지를 반드시 업로드해야 합니다."),FileAllowed(['jpg', 'jpeg', 'png', 'gif'], '이미지 파일만 업로드 가능합니다.')])
+    image = FileField('이미지 업로드', validators=[FileRequired(message="대표 이미지를 반드시 업로드해야 합니다."),FileAllowed(['jpg', 'jpeg', 'png', 'gif'], '이미지 파일만 업로드 가능합니다.'), StagedUpload()])
     images = MultipleFileField(
         "추가 이미지 (최대 4장)",
-        validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif'], "이미지 파일만 업로드 가능합니다.")]
+        validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif'], "이미지 파일만 업로드 가능합니다."), StagedUpload()]
     )
 
@@ -0,0 +1,94 @@
+import hashlib
+import os
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+from oneday import db
+from oneday.models import User
+
+# 캐시에 넣을 컬럼. 비밀번호 해시는 공유 캐시 백엔드로 나가지 않도록 뺀다
+_CACHED_COLUMNS = ('id', 'username', 'email', 'session_version')
+
+
+def init_app(app):
+    """로그인 사용자 캐시 (USER_CACHE_BACKEND).
+
+    sqlite(기본): 호스트의 워커들이 같이 쓰므로 로그아웃/비밀번호 변경의 forget() 이 모든 워커에 바로 보인다.
+    memory: 워커마다 따로라 다른 워커에는 USER_CACHE_TTL 뒤에야 반영된다 (워커 하나일 때만).
+    cache: 화면 조각 캐시(CACHE_BACKEND)를 같이 쓴다.
+    """
+    from oneday.cache import SQLiteCache, TTLCache
+
+    config = app.config
+    backend = config.get('USER_CACHE_BACKEND', 'sqlite')
+    maxsize, ttl = config.get('USER_CACHE_MAXSIZE', 1024), config.get('USER_CACHE_TTL', 60)
+    if backend == 'sqlite':
+        # 같은 호스트의 다른 DB(개발/벤치마크)와 사용자 id 가 섞이지 않게 DB 주소별 파일
+        digest = hashlib.sha1(config['SQLALCHEMY_DATABASE_URI'].encode()).hexdigest()[:12]
+        path = config.get('USER_CACHE_SQLITE_PATH') or os.path.join(config.get('SHM_DIR', '/dev/shm'),
+                                                                     f'oneday-users-{digest}.db')
+        cache = SQLiteCache(path, maxsize, ttl)
+    elif backend == 'memory':
+        cache = TTLCache(maxsize, ttl)
+    else:
+        cache = app.extensions['oneday_cache']
+    app.extensions['oneday_user_cache'] = cache
+
+
+def _cache():
+    return current_app.extensions['oneday_user_cache']
+
+
+def _key(user_id):
+    return f'user:{user_id}'
+
+
+def load_user(user_id):
+    """Flask-Login user_loader. user_id 는 User.get_id() 의 '아이디:세션버전'.
+
+    캐시에 있으면 DB 를 읽지 않고 현재 세션에 merge(load=False) 한 인스턴스를 돌려준다.
+    세션 버전이 다르면(로그아웃/비밀번호 변경 이후의 쿠키) None -> 로그아웃 상태.
+    """
+    try:
+        uid, version = (int(part) for part in user_id.split(':'))
+    except ValueError:  # 버전 없는 예전 쿠키는 다시 로그인하게 한다
+        return None
+
+    data = _cache().get(_key(uid))
+    if data is None:
+        user = db.session.get(User, uid)
+        if user is None:
+            return None
+        _cache().set(_key(uid), {name: getattr(user, name) for name in _CACHED_COLUMNS})
+    else:
+        user = User(**data)
+        make_transient_to_detached(user)  # 빠진 컬럼(password)은 접근할 때 읽는다
+        user = db.session.merge(user, load=False)
+
+    if user.session_version != version:
+        return None
+    return user
+
+
+def forget(user_id):
+    _cache().delete(_key(user_id))
+
+
+def revoke_sessions(user_id):
+    """이 사용자의 모든 세션 쿠키를 무효로 만든다 (로그아웃, 비밀번호 변경)."""
+    db.session.execute(
+        db.update(User).where(User.id == user_id)
+        .values(session_version=User.session_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    forget(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_changed_user(mapper, connection, target):
+    if has_app_context() and 'oneday_user_cache' in current_app.extensions:
+        forget(target.id)
@@ -0,0 +1,371 @@
+import contextlib
+import hashlib
+import logging
+import os
+import struct
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from oneday import db, storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 가 없으면 원본만 그대로 쓴다
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# 변형 이름 -> 긴 변 최대 픽셀
+VARIANTS = {'thumb': 320, 'medium': 1024}
+WEBP_QUALITY = 80
+# 이보다 픽셀이 많은 이미지는 변형을 만들지 않는다 (디코딩하면 픽셀당 3~4바이트를 메모리에 올린다)
+MAX_PIXELS = 40_000_000
+
+_executor = None
+
+cli = AppGroup('images', help='업로드 이미지 변형(썸네일/중간 크기) 관리')
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=current_app.config.get('IMAGE_WORKERS', 2),
+            thread_name_prefix='image-worker',
+        )
+    return _executor
+
+
+def _variant_path(rel_path, name):
+    stem, _ = os.path.splitext(rel_path)
+    return f'{stem}_{name}.webp'
+
+
+def _save_atomic(im, dest, fmt, **params):
+    # 같은 내용이 동시에 두 번 올라와도 읽는 쪽이 반쯤 쓰인 파일을 보지 않게
+    tmp = f'{dest}.{uuid.uuid4().hex[:8]}.tmp'
+    try:
+        im.save(tmp, fmt, **params)
+        os.replace(tmp, dest)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+
+
+def _strip(im, source_format, dest):
+    """방향만 반영하고 메타데이터(EXIF/GPS) 없이 dest 에 다시 저장한다."""
+    im = ImageOps.exif_transpose(im)
+    if source_format == 'JPEG':
+        im = im.convert('RGB')
+    _save_atomic(im, dest, source_format, quality=90, optimize=True)
+
+
+# 업로드 메타데이터 제거 ---------------------------------------------------------
+# 픽셀은 디코딩하지 않고 JPEG 세그먼트 / PNG·WebP 청크 단위로 EXIF·XMP 만 걸러 낸다 (요청 스레드에서 돌기 때문).
+# 방향(Orientation)만은 남겨야 사진이 눕지 않으므로 그 태그 하나짜리 EXIF 로 바꿔 넣는다.
+
+METADATA_MAX = 1 << 16          # 방향을 찾으려고 읽는 EXIF 최대 크기 (JPEG APP1 한도)
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_METADATA = {b'eXIf', b'tEXt', b'zTXt', b'iTXt'}
+XMP_HEADERS = (b'http://ns.adobe.com/xap/1.0/\x00', b'http://ns.adobe.com/xmp/extension/\x00')
+
+
+def _tiff_orientation(tiff):
+    """EXIF(TIFF) 첫 IFD 의 Orientation. 없거나 1(정방향)이면 None."""
+    if tiff.startswith(b'Exif\x00\x00'):
+        tiff = tiff[6:]
+    try:
+        order = {b'II': '<', b'MM': '>'}[tiff[:2]]
+        (ifd,) = struct.unpack_from(order + 'I', tiff, 4)
+        (count,) = struct.unpack_from(order + 'H', tiff, ifd)
+        for i in range(count):
+            tag, _, _, value = struct.unpack_from(order + 'HHI4s', tiff, ifd + 2 + 12 * i)
+            if tag == 0x0112:
+                (orientation,) = struct.unpack_from(order + 'H', value)
+                return orientation if 2 <= orientation <= 8 else None
+    except (KeyError, struct.error):
+        pass
+    return None
+
+
+def _orientation_tiff(orientation):
+    # 헤더 + IFD 하나 (항목: Orientation SHORT 1개) + 다음 IFD 없음
+    return b'MM\x00*' + struct.pack('>IHHHIHHI', 8, 1, 0x0112, 3, 1, orientation, 0, 0)
+
+
+def _is_stripped(tiff):
+    # 이미 지운 파일(방향 태그만 남긴 EXIF)은 다시 쓰지 않는다
+    if tiff.startswith(b'Exif\x00\x00'):
+        tiff = tiff[6:]
+    orientation = _tiff_orientation(tiff)
+    return orientation is not None and tiff == _orientation_tiff(orientation)
+
+
+def _jpeg_edits(f):
+    """SOS 전까지 세그먼트 머리만 읽고, EXIF/XMP APP1 을 지우는 (시작, 끝, 바꿀 바이트) 목록."""
+    if f.read(2) != b'\xff\xd8':
+        return None
+    edits, orientation = [], None
+    while True:
+        pos = f.tell()
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        while code == 0xFF:  # 채움 바이트
+            code = (f.read(1) or b'\x00')[0]
+        if code in (0xDA, 0xD9):  # 영상 데이터 시작 / 끝: 뒤는 그대로 복사
+            break
+        if 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue
+        header = f.read(2)
+        if len(header) < 2 or struct.unpack('>H', header)[0] < 2:
+            return None
+        end = f.tell() + struct.unpack('>H', header)[0] - 2
+        if code == 0xE1:
+            data = f.read(min(end - f.tell(), METADATA_MAX))
+            if data.startswith(b'Exif\x00\x00') and not _is_stripped(data):
+                orientation = orientation or _tiff_orientation(data)
+                edits.append([pos, end, b''])
+            elif data.startswith(XMP_HEADERS):
+                edits.append([pos, end, b''])
+        f.seek(end)
+    if edits and orientation:
+        app1 = b'Exif\x00\x00' + _orientation_tiff(orientation)
+        edits[0][2] = b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1
+    return edits
+
+
+def _png_edits(f):
+    if f.read(8) != PNG_SIGNATURE:
+        return None
+    edits, orientation = [], None
+    while True:
+        pos = f.tell()
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        length, kind = struct.unpack('>I4s', header)
+        end = pos + 12 + length
+        if kind == b'IEND':
+            break
+        if kind in PNG_METADATA:
+            data = f.read(length) if kind == b'eXIf' and length <= METADATA_MAX else b''
+            if data and _is_stripped(data):
+                f.seek(end)
+                continue
+            orientation = orientation or _tiff_orientation(data)
+            edits.append([pos, end, b''])
+        f.seek(end)
+    if edits and orientation:
+        body = b'eXIf' + _orientation_tiff(orientation)
+        edits[0][2] = struct.pack('>I', len(body) - 4) + body + struct.pack('>I', zlib.crc32(body))
+    return edits
+
+
+def _webp_edits(f, size):
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:] != b'WEBP':
+        return None
+    edits, orientation, vp8x, kept_exif = [], None, None, False
+    while True:
+        pos = f.tell()
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        kind, length = struct.unpack('<4sI', chunk)
+        end = pos + 8 + length + (length & 1)
+        if kind == b'VP8X':
+            vp8x = pos, f.read(1)[0]
+        elif kind in (b'EXIF', b'XMP '):
+            data = f.read(length) if kind == b'EXIF' and length <= METADATA_MAX else b''
+            if data and _is_stripped(data):
+                kept_exif = True
+            else:
+                orientation = orientation or _tiff_orientation(data)
+                edits.append([pos, end, b''])
+        f.seek(end)
+    if not edits or vp8x is None:  # 확장 헤더(VP8X) 없이 붙은 메타데이터는 깨진 파일: 건드리지 않는다
+        return None
+    flags = vp8x[1] & ~0x04  # XMP 플래그
+    if not kept_exif:
+        flags &= ~0x08  # EXIF 플래그
+    if orientation:
+        tiff = _orientation_tiff(orientation)
+        edits[0][2] = b'EXIF' + struct.pack('<I', len(tiff)) + tiff
+        flags |= 0x08
+    edits.append([vp8x[0] + 8, vp8x[0] + 9, bytes([flags])])
+    new_size = size - sum(end - start - len(data) for start, end, data in edits)
+    edits.append([4, 8, struct.pack('<I', new_size - 8)])
+    return edits
+
+
+def _rewrite(path, edits):
+    """edits 를 적용한 사본을 CHUNK 단위로 쓰면서 sha256 을 계산하고 path 를 바꾼다."""
+    h = hashlib.sha256()
+    tmp = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+    try:
+        with open(path, 'rb') as src, open(tmp, 'wb') as out:
+            def copy_until(stop):
+                while stop is None or src.tell() < stop:
+                    chunk = src.read(storage.CHUNK_SIZE if stop is None else min(storage.CHUNK_SIZE, stop - src.tell()))
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    out.write(chunk)
+
+            for start, end, data in sorted(edits):
+                copy_until(start)
+                h.update(data)
+                out.write(data)
+                src.seek(end)
+            copy_until(None)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+    return h.hexdigest()
+
+
+def strip_metadata(path):
+    """path 의 JPEG/PNG/WebP 에서 EXIF(GPS 등)/XMP 를 지운다. 지웠으면 새 sha256, 아니면 None.
+
+    storage.put 이 key 를 정하기 전에 부른다 (내용 주소 key 의 파일은 저장 뒤에 바뀌면 안 된다).
+    픽셀을 디코딩하지 않으므로 메모리는 세그먼트 머리와 복사 버퍼만큼만 쓴다.
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(12)
+            f.seek(0)
+            if head.startswith(b'\xff\xd8'):
+                edits = _jpeg_edits(f)
+            elif head.startswith(PNG_SIGNATURE):
+                edits = _png_edits(f)
+            elif head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+                edits = _webp_edits(f, os.fstat(f.fileno()).st_size)
+            else:
+                return None
+        return _rewrite(path, edits) if edits else None
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning('메타데이터 제거 실패 %s: %s', path, e)
+        return None
+
+
+def make_variants(root, rel_path, strip_original=True):
+    """root/rel_path 원본에서 VARIANTS 크기의 webp 를 만든다.
+
+    반환값은 {'thumb': 상대경로, 'medium': 상대경로}. Pillow 가 없거나 이미지가
+    아니면 빈 dict. strip_original 이면 원본의 EXIF 도 지운다 (내용 주소 key 는 put 에서 이미 지웠다).
+    """
+    if Image is None:
+        return {}
+
+    src = os.path.join(root, rel_path)
+    try:
+        with Image.open(src) as im:
+            if im.width * im.height > MAX_PIXELS:
+                logger.warning('이미지가 너무 큼 %s: %dx%d', src, im.width, im.height)
+                return {}
+            source_format = im.format
+            animated = getattr(im, 'is_animated', False)
+            if not strip_original:
+                # JPEG 는 가장 큰 변형 크기 이상으로만 줄여서 디코딩한다
+                im.draft(None, (max(VARIANTS.values()),) * 2)
+            if strip_original and not animated and source_format in ('JPEG', 'PNG', 'WEBP'):
+                _strip(im, source_format, src)
+            im = ImageOps.exif_transpose(im)
+            if im.mode not in ('RGB', 'RGBA'):
+                im = im.convert('RGBA' if 'transparency' in im.info else 'RGB')
+
+            variants = {}
+            for name, size in VARIANTS.items():
+                copy = im.copy()
+                copy.thumbnail((size, size))
+                rel = _variant_path(rel_path, name)
+                _save_atomic(copy, os.path.join(root, rel), 'WEBP', quality=WEBP_QUALITY, method=4)
+                variants[name] = rel.replace('\\', '/')
+            return variants
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning('이미지 변형 실패 %s: %s', src, e)
+        return {}
+
+
+def _stored_variants(rel_path):
+    """업로드 저장소(oneday.storage) 파일의 변형을 만든다.
+
+    내용 주소 key 의 원본은 건드리지 않는다 (key 가 곧 sha256 이고 강한 ETag 로 나간다).
+    같은 내용이 다시 올라와 변형이 이미 있으면 그대로 쓴다.
+    """
+    backend = storage.get_backend()
+    content = storage.is_content_key(rel_path)
+    existing = {name: _variant_path(rel_path, name) for name in VARIANTS}
+    if content and all(backend.exists(rel) for rel in existing.values()):
+        return existing
+    if backend.is_local:
+        return make_variants(backend.root, rel_path, strip_original=not content)
+    with storage.local_copy(rel_path, backend) as root:
+        variants = make_variants(root, rel_path, strip_original=not content)
+        if variants:  # 변형과, 예전 key 면 EXIF 를 지운 원본도 올린다
+            for rel in [*([] if content else [rel_path]), *variants.values()]:
+                backend.save(rel, os.path.join(root, *rel.split('/')))
+    return variants
+
+
+def _process(app, model, obj_id, root, rel_path):
+    from oneday.models import CourseImage
+    from oneday.views.course_views import invalidate_course_lists
+
+    with app.app_context():
+        if root == app.config['UPLOAD_FOLDER']:
+            variants = _stored_variants(rel_path)
+        else:
+            variants = make_variants(root, rel_path)
+        if not variants:
+            return
+        obj = db.session.get(model, obj_id)
+        if obj is None:  # 처리 중에 삭제됨
+            return
+        obj.thumb_path = variants['thumb']
+        obj.medium_path = variants['medium']
+        db.session.commit()
+        if isinstance(obj, CourseImage):
+            # 카드 조각에 원본 대신 썸네일이 보이도록
+            invalidate_course_lists(obj.course.is_published)
+        logger.debug('이미지 변형 완료 %s#%s -> %s', model.__name__, obj_id, variants)
+
+
+def schedule(obj, root, rel_path):
+    """commit 이 끝난 obj(CourseImage/Question)의 이미지 변형을 백그라운드로 만든다.
+
+    요청은 원본이 디스크에 저장된 시점에 바로 응답하고, 변형이 끝나기 전까지
+    템플릿은 원본 경로를 쓴다.
+    """
+    app = current_app._get_current_object()
+    _get_executor().submit(_process, app, type(obj), obj.id, root, rel_path)
+
+
+@cli.command('process-pending')
+def process_pending():
+    """변형이 아직 없는 이미지를 모두 처리한다 (기존 업로드 백필용)."""
+    from oneday.models import CourseImage, Question
+
+    upload_root = current_app.config['UPLOAD_FOLDER']
+    static_root = current_app.static_folder
+    done = 0
+    for model, column in [(CourseImage, CourseImage.path), (Question, Question.image_path)]:
+        rows = db.session.execute(
+            db.select(model.id, column).where(column.isnot(None), model.thumb_path.is_(None))
+        ).all()
+        for obj_id, rel_path in rows:
+            # 질문 이미지는 예전에는 static/photo/ 아래, 지금은 업로드 저장소에 있다
+            root = static_root if rel_path.startswith('photo/') else upload_root
+            _process(current_app._get_current_object(), model, obj_id, root, rel_path)
+            done += 1
+    click.echo(f'{done}개 이미지를 처리했습니다.')
@@ -0,0 +1,212 @@
+import cProfile
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import abort, g, has_app_context, request
+from sqlalchemy import event
+
+from oneday import db
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # 없으면 cProfile 로 대신한다
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+# 요청 시간 히스토그램 경계 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Metrics:
+    """엔드포인트별 요청 수/시간/쿼리 수. 워커(프로세스)마다 따로 집계된다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()            # (endpoint, method, status) -> 횟수
+        self.duration_sum = defaultdict(float)  # endpoint -> 초 합계
+        self.duration_count = Counter()
+        self.buckets = defaultdict(Counter)  # endpoint -> {경계: 누적 횟수}
+        self.sql_queries = Counter()         # endpoint -> 쿼리 수
+        self.sql_seconds = defaultdict(float)
+
+    def observe(self, endpoint, method, status, seconds, queries, sql_seconds):
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            self.duration_sum[endpoint] += seconds
+            self.duration_count[endpoint] += 1
+            for bound in BUCKETS:
+                if seconds <= bound:
+                    self.buckets[endpoint][bound] += 1
+            self.sql_queries[endpoint] += queries
+            self.sql_seconds[endpoint] += sql_seconds
+
+    def render(self):
+        """Prometheus 텍스트 형식."""
+        lines = [
+            '# TYPE oneday_requests_total counter',
+        ]
+        with self._lock:
+            for (endpoint, method, status), n in sorted(self.requests.items()):
+                lines.append(f'oneday_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {n}')
+            lines.append('# TYPE oneday_request_duration_seconds histogram')
+            for endpoint in sorted(self.duration_count):
+                for bound in BUCKETS:
+                    lines.append(f'oneday_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} '
+                                 f'{self.buckets[endpoint][bound]}')
+                lines.append(f'oneday_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} '
+                             f'{self.duration_count[endpoint]}')
+                lines.append(f'oneday_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self.duration_sum[endpoint]:.6f}')
+                lines.append(f'oneday_request_duration_seconds_count{{endpoint="{endpoint}"}} {self.duration_count[endpoint]}')
+            lines.append('# TYPE oneday_sql_queries_total counter')
+            for endpoint, n in sorted(self.sql_queries.items()):
+                lines.append(f'oneday_sql_queries_total{{endpoint="{endpoint}"}} {n}')
+            lines.append('# TYPE oneday_sql_seconds_total counter')
+            for endpoint, s in sorted(self.sql_seconds.items()):
+                lines.append(f'oneday_sql_seconds_total{{endpoint="{endpoint}"}} {s:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'sql_count' in g:
+        g.sql_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'sql_count' in g:
+        g.sql_seconds += time.perf_counter() - g.get('sql_started', time.perf_counter())
+        g.sql_count += 1
+        g.sql_statements[statement] += 1
+
+
+class _ProfilingMiddleware:
+    """요청 일부(PROFILE_SAMPLE_RATE) 또는 X-Profile 헤더가 붙은 요청을 프로파일링해 파일로 남긴다.
+
+    헤더는 값이 PROFILE_TOKEN 과 같을 때만 인정한다 (아무나 프로파일링을 켜지 못하게).
+    """
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.sample_rate = config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.token = config.get('PROFILE_TOKEN')
+        self.directory = config.get('PROFILE_DIR')
+        os.makedirs(self.directory, exist_ok=True)
+        # 3.12 부터 cProfile 은 프로세스에 하나만 켤 수 있다 (sys.monitoring). gthread 워커에서도 한 번에 한 요청만
+        self._lock = threading.Lock()
+
+    def _wanted(self, environ):
+        if self.token and environ.get('HTTP_X_PROFILE') == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _call_app(self, environ, start_response):
+        result = self.wsgi_app(environ, start_response)
+        try:
+            return b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ) or not self._lock.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+        try:
+            return self._profile(environ, start_response)
+        finally:
+            self._lock.release()
+
+    def _profile(self, environ, start_response):
+        started = time.perf_counter()
+        if PyinstrumentProfiler is not None:
+            profiler = PyinstrumentProfiler()
+            profiler.start()
+            try:
+                body = self._call_app(environ, start_response)
+            finally:
+                profiler.stop()
+        else:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # 다른 도구가 이미 프로파일러를 켜 둠: 프로파일 없이 처리
+                return [self._call_app(environ, start_response)]
+            try:
+                body = self._call_app(environ, start_response)
+            finally:
+                profiler.disable()
+
+        name = '{}.{}.{:.0f}ms.{}'.format(
+            environ.get('REQUEST_METHOD', 'GET'),
+            environ.get('PATH_INFO', '/').strip('/').replace('/', '.') or 'root',
+            (time.perf_counter() - started) * 1000,
+            int(time.time() * 1000),
+        )
+        if PyinstrumentProfiler is not None:
+            path = os.path.join(self.directory, name + '.html')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+        else:
+            path = os.path.join(self.directory, name + '.prof')
+            profiler.dump_stats(path)
+        logger.info('프로파일 저장: %s', path)
+        return [body]
+
+
+def init_app(app):
+    """INSTRUMENTATION_ENABLED 일 때만 요청/SQL 계측, Server-Timing, /metrics, 프로파일링을 켠다."""
+    if not app.config.get('INSTRUMENTATION_ENABLED'):
+        return
+
+    metrics = Metrics()
+    app.extensions['oneday_metrics'] = metrics
+    threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+        g.sql_statements = Counter()
+
+    @app.after_request
+    def _record(response):
+        if 'request_started' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        endpoint = request.endpoint or 'unmatched'
+
+        response.headers.add(
+            'Server-Timing',
+            f'app;dur={elapsed * 1000:.1f}, db;dur={g.sql_seconds * 1000:.1f};desc="{g.sql_count} queries"',
+        )
+        metrics.observe(endpoint, request.method, response.status_code, elapsed, g.sql_count, g.sql_seconds)
+
+        # 같은 SQL 이 한 요청에서 여러 번 -> 템플릿/루프 안의 lazy load 일 가능성이 높다
+        for statement, n in g.sql_statements.items():
+            if n >= threshold:
+                logger.warning('N+1 의심: %s 에서 같은 쿼리 %d회: %s', endpoint, n, ' '.join(statement.split())[:200])
+        return response
+
+    token = app.config.get('PROFILE_TOKEN')
+    allowed_ips = set(app.config.get('METRICS_ALLOW_IPS', ()))
+
+    @app.route('/metrics')
+    def metrics_view():
+        """Authorization: Bearer <PROFILE_TOKEN> 이거나 METRICS_ALLOW_IPS 에서 온 요청만. 아니면 없는 척 404."""
+        authorization = request.headers.get('Authorization', '')
+        if not (token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())) \
+                and request.remote_addr not in allowed_ips:
+            abort(404)
+        return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+    if app.config.get('PROFILE_SAMPLE_RATE') or app.config.get('PROFILE_TOKEN'):
+        app.wsgi_app = _ProfilingMiddleware(app.wsgi_app, app.config)
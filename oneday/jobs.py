@@ -0,0 +1,301 @@
+import datetime
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+
+from oneday import booking, db, notifications
+from oneday.models import Job, Reservation, User
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# 실패한 작업은 RETRY_BASE * 2^(시도-1) 초 뒤에 다시 시도한다
+RETRY_BASE = 30
+
+# 작업 종류 -> 함수(payload). @handler 로 등록한다
+HANDLERS = {}
+
+# 워커가 주기마다 한 번씩 넣는 작업: 종류 -> 주기(초)를 담은 설정 키
+PERIODIC = {
+    "reservations.advance": "JOBS_RESERVATION_INTERVAL",
+    "reservations.remind": "JOBS_RESERVATION_INTERVAL",
+}
+
+cli = AppGroup("jobs", help="예약 상태 전환/알림 같은 백그라운드 작업 큐")
+
+
+def init_app(app):
+    notifications.init_app(app)
+    app.cli.add_command(cli)
+
+
+def handler(kind):
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def _now():
+    return datetime.datetime.now().replace(microsecond=0)
+
+
+def enqueue_many(rows):
+    """rows: [{'kind', 'payload', 'run_at', 'dedupe_key'}, ...]. dedupe_key 가 이미 있는 작업은 건너뛴다.
+
+    commit 은 호출한 쪽에서 (요청 처리 중이면 그 트랜잭션과 같이 반영된다). 반환값은 새로 들어간 수.
+    """
+    if not rows:
+        return 0
+    now = _now()
+    values = [
+        {"kind": r["kind"], "payload": r.get("payload"), "run_at": r.get("run_at") or now,
+         "dedupe_key": r.get("dedupe_key"), "status": QUEUED}
+        for r in rows
+    ]
+    dialect = postgresql if db.engine.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(Job).values(values).on_conflict_do_nothing(index_elements=[Job.dedupe_key])
+    return db.session.execute(stmt).rowcount
+
+
+def enqueue(kind, payload=None, run_at=None, dedupe_key=None):
+    return enqueue_many([{"kind": kind, "payload": payload, "run_at": run_at, "dedupe_key": dedupe_key}]) == 1
+
+
+def schedule_periodic():
+    """PERIODIC 작업을 주기 구간마다 한 번만 넣는다. 워커가 여러 개여도 dedupe_key 가 같아 한 건."""
+    stamp = time.time()
+    rows = []
+    for kind, key in PERIODIC.items():
+        interval = current_app.config.get(key, 300)
+        rows.append({"kind": kind, "dedupe_key": f"{kind}@{int(stamp // interval)}"})
+    enqueue_many(rows)
+    db.session.commit()
+
+
+def _claim(worker_id, limit, lock_timeout):
+    """run_at 이 지난 작업을 limit 개까지 이 워커 것으로 표시하고 돌려준다.
+
+    UPDATE 한 문장의 WHERE 에 status 조건이 같이 있어, 워커 둘이 같은 작업을 집어도
+    한쪽만 바뀐다 (PostgreSQL 은 행 잠금 후 조건 재평가, SQLite 는 쓰기 직렬화).
+    """
+    now = _now()
+    # 실행중인 채로 오래된 작업은 워커가 죽은 것으로 보고 다시 큐에 넣는다
+    db.session.execute(
+        update(Job)
+        .where(Job.status == RUNNING, Job.locked_at < now - datetime.timedelta(seconds=lock_timeout))
+        .values(status=QUEUED, locked_by=None, locked_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    due = (
+        db.select(Job.id)
+        .where(Job.status == QUEUED, Job.run_at <= now)
+        .order_by(Job.run_at, Job.id)
+        .limit(limit)
+    )
+    db.session.execute(
+        update(Job)
+        .where(Job.id.in_(due), Job.status == QUEUED)
+        .values(status=RUNNING, locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return (
+        Job.query
+        .filter(Job.status == RUNNING, Job.locked_by == worker_id)
+        .order_by(Job.run_at, Job.id)
+        .all()
+    )
+
+
+def _run(job_id, max_attempts):
+    job = db.session.get(Job, job_id)
+    kind, payload = job.kind, job.payload or {}
+    started = time.perf_counter()
+    try:
+        fn = HANDLERS.get(kind)
+        if fn is None:
+            raise LookupError(f"등록되지 않은 작업 종류: {kind}")
+        fn(payload)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = f"{type(e).__name__}: {e}"[:2000]
+        job.locked_by = job.locked_at = None
+        if job.attempts >= max_attempts:
+            job.status = FAILED
+            job.finished_at = _now()
+            logger.exception("작업 실패 (포기) #%s %s", job_id, kind)
+        else:
+            job.status = QUEUED
+            job.run_at = _now() + datetime.timedelta(seconds=RETRY_BASE * 2 ** (job.attempts - 1))
+            logger.warning("작업 실패, %s 에 다시 시도 #%s %s: %s", job.run_at, job_id, kind, e)
+        db.session.commit()
+        return False
+
+    job = db.session.get(Job, job_id)
+    job.status = DONE
+    job.finished_at = _now()
+    job.locked_by = job.locked_at = None
+    db.session.commit()
+    logger.info("작업 완료 #%s %s (%.0fms)", job_id, kind, (time.perf_counter() - started) * 1000)
+    return True
+
+
+def work(once=False, batch=None, poll=None):
+    """작업을 가져와 실행한다. once 면 지금 실행할 작업이 없을 때 끝난다 (cron 용)."""
+    config = current_app.config
+    batch = batch or config.get("JOBS_BATCH", 20)
+    poll = poll or config.get("JOBS_POLL_SECONDS", 5)
+    max_attempts = config.get("JOBS_MAX_ATTEMPTS", 5)
+    lock_timeout = config.get("JOBS_LOCK_TIMEOUT", 600)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    stopping = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        # SIGTERM(컨테이너 종료)이면 지금 작업까지만 끝내고 나간다
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+
+    done = failed = 0
+    scheduled = False
+    while not stopping.is_set():
+        try:
+            if not (once and scheduled):
+                schedule_periodic()
+                scheduled = True
+            job_ids = [job.id for job in _claim(worker_id, batch, lock_timeout)]
+        except OperationalError as e:  # DB 잠김/연결 끊김: 잠시 뒤 다시
+            db.session.rollback()
+            logger.warning("작업 큐 조회 실패: %s", e)
+            job_ids = []
+        for job_id in job_ids:
+            if _run(job_id, max_attempts):
+                done += 1
+            else:
+                failed += 1
+        if job_ids:
+            continue
+        if once:
+            break
+        stopping.wait(poll)
+    return done, failed
+
+
+# 예약 관련 작업 ----------------------------------------------------------------
+
+@handler("reservations.advance")
+def _advance_reservations(payload):
+    config = current_app.config
+    changed = booking.advance_statuses(
+        confirm_days=config.get("RESERVATION_CONFIRM_DAYS", 2),
+        chunk_size=config.get("JOBS_CHUNK_SIZE", 500),
+        pause=config.get("JOBS_CHUNK_PAUSE", 0.05),
+    )
+    logger.info("예약 상태 전환: %s", changed)
+
+
+@handler("reservations.remind")
+def _enqueue_reminders(payload):
+    """수업이 가까운 확정 예약마다 알림 작업을 하나씩 넣는다 (예약 + 날짜당 한 번)."""
+    config = current_app.config
+    chunk_size = config.get("JOBS_CHUNK_SIZE", 500)
+    today = datetime.date.today()
+    after_id = 0
+    while True:
+        rows = booking.upcoming_confirmed(today, config.get("REMINDER_DAYS_BEFORE", 1), after_id, chunk_size)
+        if not rows:
+            return
+        enqueue_many([
+            {"kind": "notify.reminder", "payload": {"reservation_id": res_id},
+             "dedupe_key": f"remind:{res_id}:{day.isoformat()}"}
+            for res_id, day in rows
+        ])
+        db.session.commit()
+        after_id = rows[-1][0]
+
+
+@handler("notify.reminder")
+def _send_reminder(payload):
+    reservation = db.session.get(Reservation, payload["reservation_id"])
+    if reservation is None or reservation.status != booking.CONFIRMED:  # 그사이 취소/변경됨
+        return
+    user = db.session.get(User, reservation.user_id)
+    notifications.send(
+        to=user.email,
+        subject=f"[원데이클래스] {reservation.reserved_date:%m월 %d일} {reservation.class_name} 수업 안내",
+        body=(f"{user.username}님, {reservation.reserved_date:%Y-%m-%d} {reservation.reserved_time} "
+              f"{reservation.class_name} 수업이 예약되어 있습니다."),
+        kind="reminder",
+        reservation_id=reservation.id,
+    )
+
+
+# CLI ------------------------------------------------------------------------
+
+@cli.command("worker")
+@click.option("--once", is_flag=True, help="지금 실행할 작업만 처리하고 끝낸다 (cron 용)")
+@click.option("--batch", type=int, default=None, help="한 번에 가져올 작업 수")
+@click.option("--poll", type=float, default=None, help="작업이 없을 때 기다리는 초")
+def worker_command(once, batch, poll):
+    """작업 큐를 처리한다. 웹 프로세스와 별도로 하나 이상 띄운다."""
+    done, failed = work(once=once, batch=batch, poll=poll)
+    click.echo(f"완료 {done}건, 실패 {failed}건")
+
+
+@cli.command("enqueue")
+@click.argument("kind")
+@click.option("--payload", default=None, help="JSON 객체")
+def enqueue_command(kind, payload):
+    """작업 하나를 지금 실행하도록 넣는다 (예: flask jobs enqueue reservations.advance)."""
+    if kind not in HANDLERS:
+        raise click.BadParameter(f"알 수 없는 작업 종류 (가능: {', '.join(sorted(HANDLERS))})")
+    enqueue(kind, json.loads(payload) if payload else None)
+    db.session.commit()
+    click.echo(f"{kind} 작업을 넣었습니다.")
+
+
+@cli.command("status")
+def status_command():
+    """상태별 작업 수와 최근 실패."""
+    rows = db.session.execute(
+        db.select(Job.status, Job.kind, db.func.count(Job.id)).group_by(Job.status, Job.kind)
+    ).all()
+    for status, kind, count in sorted(rows):
+        click.echo(f"{status:8} {kind:24} {count}")
+    for job in Job.query.filter_by(status=FAILED).order_by(Job.id.desc()).limit(5):
+        click.echo(f"실패 #{job.id} {job.kind}: {job.last_error}")
+
+
+@cli.command("prune")
+@click.option("--days", default=7, help="이보다 오래전에 끝난 작업을 지운다")
+def prune_command(days):
+    """끝난(완료) 작업 기록을 chunk 단위로 지운다.
+
+    dedupe_key 도 같이 사라지므로 days 는 REMINDER_DAYS_BEFORE 보다 길어야 알림이 두 번 가지 않는다.
+    """
+    cutoff = _now() - datetime.timedelta(days=days)
+    chunk_size = current_app.config.get("JOBS_CHUNK_SIZE", 500)
+    removed = 0
+    while True:
+        ids = db.select(Job.id).where(Job.status == DONE, Job.finished_at < cutoff).limit(chunk_size)
+        count = db.session.execute(
+            db.delete(Job).where(Job.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        removed += count
+        if count < chunk_size:
+            break
+    click.echo(f"{removed}건 삭제")
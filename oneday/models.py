@@ -1,31 +1,72 @@
-from oneday import db
+from oneday import db, passwords
 from sqlalchemy.sql import func
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy.dialects import sqlite
+
+# SQLite 의 CURRENT_TIMESTAMP(server_default) 와 같은 'YYYY-MM-DD HH:MM:SS' 형식으로 저장한다.
+# 기본 형식(마이크로초 포함)으로 바인딩하면 문자열 비교가 어긋나 keyset 페이징이 틀어진다.
+SecondDateTime = db.DateTime().with_variant(
+    sqlite.DATETIME(storage_format='%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d'),
+    'sqlite',
+)
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(150), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    # 로그인 쿠키에 같이 들어가는 번호. 올리면 기존 세션이 모두 무효가 된다 (oneday.identity)
+    session_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def get_id(self):
+        return f'{self.id}:{self.session_version}'
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        """맞으면 True. 해시 설정(PASSWORD_HASH_METHOD)이 바뀌었으면 새 설정으로 다시 저장해 둔다."""
+        if not passwords.verify(self.password, password):
+            return False
+        if passwords.needs_rehash(self.password):
+            # 세션 버전은 그대로 (같은 비밀번호라 다른 기기 로그인을 끊을 이유가 없다)
+            self.password = passwords.hash_password(password)
+            db.session.commit()
+        return True
+
+    def set_password(self, password):
+        self.password = passwords.hash_password(password)
+        # 비밀번호가 바뀌면 다른 기기의 로그인도 끊는다
+        self.session_version = (self.session_version or 0) + 1
 
 
 class Question(db.Model):
+    __table_args__ = (
+        # 목록 keyset 페이징: ORDER BY create_date DESC, id DESC 를 인덱스로 처리
+        db.Index('ix_question_create_date_id', 'create_date', 'id'),
+        # 업로드 파일 참조 수 (oneday.storage.recount)
+        db.Index('ix_question_image_path', 'image_path'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     subject = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text(), nullable=False)
     create_date = db.Column(db.DateTime(), nullable=False)
     modify_date = db.Column(db.DateTime(), nullable=True)
     image_path = db.Column(db.String(200), nullable=True)
+    # 백그라운드에서 만든 webp 변형 (oneday.images), 만들어지기 전에는 None
+    thumb_path = db.Column(db.String(200), nullable=True)
+    medium_path = db.Column(db.String(200), nullable=True)
+    # 목록 화면용 비정규화 답변 수 (answer_views 에서 증감)
+    answer_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     user = db.relationship('User', backref=db.backref('question_set', lazy=True))
 
 
 class Answer(db.Model):
+    __table_args__ = (
+        # 상세 화면 답변 keyset 페이징: question_id 로 좁히고 create_date, id 순서
+        db.Index('ix_answer_question_create', 'question_id', 'create_date', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text(), nullable=False)
     create_date = db.Column(db.DateTime(), nullable=False)
@@ -47,21 +88,48 @@ class Reservation(db.Model):
     reserved_date = db.Column(db.Date, nullable=False)
     reserved_time = db.Column(db.String(20), nullable=False)
     status = db.Column(db.String(20), nullable=False)
+    # 회차 예약이면 좌석을 차지하는 ClassSession (자유 입력 예약은 None)
+    session_id = db.Column(db.Integer, db.ForeignKey("class_session.id", ondelete="SET NULL"), nullable=True)
+    session = db.relationship("ClassSession", backref=db.backref("reservations", lazy=True))
+
+    __table_args__ = (
+        # 같은 회차 중복 예약 방지 (session_id 가 NULL 인 기존 예약은 제약 대상 아님)
+        db.UniqueConstraint("session_id", "user_id", name="uq_reservation_session_user"),
+        # 내 예약 목록: user_id 필터 + (reserved_date, id) keyset, 상태별 요약
+        db.Index("ix_reservation_user_date", "user_id", "reserved_date", "id"),
+        # 상태 전환 작업 (oneday.jobs): 상태 + 날짜 범위로 바꿀 행만 찾는다
+        db.Index("ix_reservation_status_date", "status", "reserved_date"),
+    )
 
 
 class Course(db.Model):
     __tablename__ = "course"
+    __table_args__ = (
+        # 워크스페이스/카탈로그 API: is_published 필터 + created_at keyset
+        db.Index("ix_course_published_created", "is_published", "created_at", "id"),
+        db.Index("ix_course_price", "price", "id"),
+        db.Index("ix_course_main_image", "image_path"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     classid = db.Column(db.String(50), unique=True, nullable=False)
     description = db.Column(db.Text, nullable=False)
     price = db.Column(db.Integer, nullable=False, default=0)
-    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    created_at = db.Column(SecondDateTime, nullable=False, server_default=db.func.now())
     duration_minutes = db.Column(db.Integer, nullable=False, default=60)
     is_published = db.Column(db.Boolean, default=False, nullable=False)
     image_path = db.Column(db.String(200), nullable=True)
+    # 클래스 상세 페이지 (/class/<slug>). slug 가 없으면 상세 페이지가 없다
+    slug = db.Column(db.String(80), unique=True, index=True, nullable=True)
+    title = db.Column(db.String(200), nullable=True)
+    cover_url = db.Column(db.String(500), nullable=True)  # 업로드 이미지가 없을 때 쓰는 외부 이미지
+    lead_days = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # 최소 며칠 전 예약
+    details = db.Column(db.JSON, nullable=True)  # {'intro', 'curriculum', 'host', 'location'}: 탭별 HTML
 
-    images = db.relationship("CourseImage", backref="course", lazy="selectin", cascade="all, delete-orphan")
+    images = db.relationship(
+        "CourseImage", backref="course", lazy="selectin", cascade="all, delete-orphan",
+        order_by="(CourseImage.created_at, CourseImage.id)",
+    )
 
 
 class CourseImage(db.Model):
@@ -69,8 +137,86 @@ class CourseImage(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey("course.id", ondelete="CASCADE"), nullable=False, index=True)
-    path = db.Column(db.String(200), nullable=False)
+    path = db.Column(db.String(200), nullable=False, index=True)
+    thumb_path = db.Column(db.String(200), nullable=True)
+    medium_path = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, server_default=func.now())
 
     def __repr__(self):
         return f"<CourseImage course_id={self.course_id} path={self.path!r}>"
+
+
+class ClassSession(db.Model):
+    """코스의 한 회차. seats_taken 은 oneday.booking 의 조건부 UPDATE 로만 바꾼다."""
+    __tablename__ = "class_session"
+    __table_args__ = (
+        db.CheckConstraint("seats_taken >= 0 AND seats_taken <= capacity", name="ck_class_session_seats"),
+        db.Index("ix_class_session_course_starts", "course_id", "starts_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey("course.id", ondelete="CASCADE"), nullable=False)
+    starts_at = db.Column(db.DateTime, nullable=False)
+    capacity = db.Column(db.Integer, nullable=False)
+    seats_taken = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    course = db.relationship("Course", backref=db.backref("sessions", lazy=True, cascade="all, delete-orphan",
+                                                          order_by="ClassSession.starts_at"))
+
+    @property
+    def seats_left(self):
+        return self.capacity - self.seats_taken
+
+
+class DayOccupancy(db.Model):
+    """코스별 하루 정원/예약 합계. 회차 추가와 좌석 증감 때 oneday.booking 이 같이 갱신한다."""
+    __tablename__ = "course_day_occupancy"
+
+    course_id = db.Column(db.Integer, db.ForeignKey("course.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    capacity = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    seats_taken = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    course = db.relationship("Course", backref=db.backref("day_occupancy", lazy=True, cascade="all, delete-orphan"))
+
+    @property
+    def seats_left(self):
+        return self.capacity - self.seats_taken
+
+
+class Job(db.Model):
+    """oneday.jobs 의 작업 큐 한 건. 워커(`flask jobs worker`)가 run_at 이 지난 것부터 가져간다."""
+    __tablename__ = "job"
+    __table_args__ = (
+        db.Index("ix_job_status_run_at", "status", "run_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="queued", server_default="queued")
+    run_at = db.Column(SecondDateTime, nullable=False, server_default=db.func.now())
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    last_error = db.Column(db.Text, nullable=True)
+    # 같은 작업을 두 번 넣지 않기 위한 키 (예: 'remind:42:2026-10-20'). NULL 은 중복 허용
+    dedupe_key = db.Column(db.String(200), unique=True, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(SecondDateTime, nullable=True)
+    created_at = db.Column(SecondDateTime, nullable=False, server_default=db.func.now())
+    finished_at = db.Column(SecondDateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status}>"
+
+
+class StoredFile(db.Model):
+    """내용 주소(cas/..) 업로드 파일 하나와 그 파일을 가리키는 행 수. oneday.storage 가 flush 때 다시 센다."""
+    __tablename__ = "stored_file"
+    __table_args__ = (
+        db.Index("ix_stored_file_refs_updated", "refs", "updated_at"),
+    )
+
+    key = db.Column(db.String(200), primary_key=True)
+    refs = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    created_at = db.Column(SecondDateTime, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(SecondDateTime, nullable=False, server_default=db.func.now())  # 참조 수가 바뀐 시각
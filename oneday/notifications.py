@@ -0,0 +1,49 @@
+import json
+import logging
+import os
+import threading
+
+from flask import current_app
+from werkzeug.utils import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class LogSink:
+    """알림을 로그로만 남긴다 (개발용 기본값)."""
+
+    def __init__(self, config):
+        pass
+
+    def send(self, message):
+        logger.info('알림 -> %s: %s', message['to'], message['subject'])
+
+
+class OutboxSink:
+    """알림을 NOTIFICATION_OUTBOX 파일에 JSON 한 줄씩 덧붙인다. 다른 프로세스가 읽어 발송한다."""
+
+    def __init__(self, config):
+        self.path = config['NOTIFICATION_OUTBOX']
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+    def send(self, message):
+        line = json.dumps(message, ensure_ascii=False, default=str) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+SINKS = {'log': LogSink, 'outbox': OutboxSink}
+
+
+def init_app(app):
+    """NOTIFICATION_SINK: log / outbox, 또는 send(message) 를 가진 클래스의 import 경로."""
+    name = app.config.get('NOTIFICATION_SINK', 'log')
+    sink_class = SINKS[name] if name in SINKS else import_string(name)
+    app.extensions['oneday_notifications'] = sink_class(app.config)
+
+
+def send(to, subject, body, **extra):
+    """알림 한 건을 설정된 sink 로 보낸다. sink 가 예외를 내면 그대로 올려 작업이 재시도되게 한다."""
+    message = dict(extra, to=to, subject=subject, body=body)
+    current_app.extensions['oneday_notifications'].send(message)
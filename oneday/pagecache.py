@@ -0,0 +1,136 @@
+import functools
+import hashlib
+import logging
+import os
+
+import click
+from flask import current_app, make_response, request, session
+from flask.cli import AppGroup
+from sqlalchemy.exc import SQLAlchemyError
+
+from oneday.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+cli = AppGroup('pages', help='비로그인 전체 페이지 캐시 (미리 렌더링)')
+
+def build_id(app):
+    """배포 식별자. DEPLOY_ID 가 없으면 템플릿/정적 파일(업로드 사진 제외) 내용 해시.
+
+    템플릿이나 CSS 가 바뀌어 배포되면 값이 바뀌므로 예전 캐시/미리 렌더링 파일은 쓰이지 않는다.
+    """
+    if app.config.get('DEPLOY_ID'):
+        return app.config['DEPLOY_ID']
+    h = hashlib.sha256()
+    for root in (os.path.join(app.root_path, app.template_folder), app.static_folder):
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != 'photo')
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                h.update(os.path.relpath(path, root).encode())
+                with open(path, 'rb') as f:
+                    h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+def init_app(app):
+    app.extensions['oneday_pagecache'] = {
+        'build': build_id(app),
+        'store': TTLCache(app.config.get('PAGE_CACHE_MAXSIZE', 128), app.config.get('PAGE_CACHE_TTL', 300)),
+    }
+    app.cli.add_command(cli)
+
+
+def _disk_path(build, path):
+    directory = current_app.config.get('PAGE_CACHE_DIR')
+    if not directory:
+        return None
+    name = path.strip('/').replace('/', '__') or 'index'
+    return os.path.join(directory, build, name + '.html')
+
+
+def _anonymous():
+    # current_user 를 건드리면 user_loader 가 돌므로 세션 키만 본다. 플래시가 남아 있어도 캐시하지 않는다
+    return '_user_id' not in session and '_flashes' not in session
+
+
+def cached_page(prerender=None, on_disk=True):
+    """비로그인 GET 요청의 렌더링 결과를 통째로 캐시한다 (쿼리 문자열이 있으면 건너뜀).
+
+    PAGE_CACHE_DIR 이 있으면 `flask pages prerender` 로 만들어 둔 HTML 을 먼저 찾는다.
+    prerender 는 미리 렌더링할 경로 목록을 돌려주는 함수 (없으면 엔드포인트 경로 하나).
+    DB 내용이 보이는 페이지는 on_disk=False: 파일은 배포 때까지 그대로라 clear() 로 지울 수 없다.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            state = current_app.extensions['oneday_pagecache']
+            if not current_app.config.get('PAGE_CACHE_ENABLED', True) or request.args or not _anonymous():
+                return view(*args, **kwargs)
+
+            key = f"{state['build']}:{request.path}"
+            hit = state['store'].get(key)
+            if hit is None:
+                disk = on_disk and _disk_path(state['build'], request.path)
+                if disk and os.path.exists(disk):
+                    with open(disk, 'rb') as f:
+                        hit = f.read()
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.mimetype != 'text/html':
+                        return response
+                    hit = response.get_data()
+                state['store'].set(key, hit)
+
+            response = make_response(hit)
+            response.set_etag(hashlib.sha1(hit).hexdigest(), weak=True)
+            response.reuse_compressed = True  # oneday.responses 가 압축 결과를 재사용
+            response.cache_control.public = True
+            response.cache_control.max_age = current_app.config.get('PAGE_CACHE_MAX_AGE', 60)
+            response.vary.add('Cookie')
+            return response
+
+        wrapper.cached_page = True
+        wrapper.prerender = prerender
+        wrapper.on_disk = on_disk
+        return wrapper
+    return decorator
+
+
+def clear():
+    current_app.extensions['oneday_pagecache']['store'].clear()
+
+
+@cli.command('prerender')
+def prerender():
+    """cached_page 페이지들을 비로그인 상태로 렌더링해 PAGE_CACHE_DIR/<배포ID>/ 에 저장한다."""
+    state = current_app.extensions['oneday_pagecache']
+    if not current_app.config.get('PAGE_CACHE_DIR'):
+        raise click.ClickException('PAGE_CACHE_DIR 이 설정되어 있지 않습니다.')
+
+    paths = []
+    for rule in current_app.url_map.iter_rules():
+        view = current_app.view_functions[rule.endpoint]
+        if not getattr(view, 'on_disk', False) or 'GET' not in rule.methods:
+            continue
+        if view.prerender is not None:
+            try:
+                with current_app.test_request_context():
+                    paths.extend(view.prerender())
+            except SQLAlchemyError as e:  # 이미지 빌드 때처럼 DB 가 없으면 해당 페이지는 요청 때 렌더링
+                click.echo(f'{rule.rule}: 목록을 읽지 못해 건너뜀 ({e.__class__.__name__})')
+        elif not rule.arguments:
+            paths.append(rule.rule)
+
+    client = current_app.test_client()
+    for path in sorted(set(paths)):
+        response = client.get(path)
+        if response.status_code != 200:
+            click.echo(f'건너뜀 {path} ({response.status_code})')
+            continue
+        target = _disk_path(state['build'], path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + '.tmp', 'wb') as f:
+            f.write(state['store'].get(f"{state['build']}:{path}") or response.get_data())
+        os.replace(target + '.tmp', target)
+        click.echo(f'{path} -> {target}')
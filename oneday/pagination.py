@@ -0,0 +1,137 @@
+import base64
+import json
+import math
+import time
+from datetime import date, datetime
+
+from flask import abort
+from sqlalchemy import tuple_
+
+
+class KeysetPage:
+    """커서(keyset) 기반 페이지. 템플릿에서 Pagination 객체와 비슷하게 쓴다."""
+
+    def __init__(self, items, per_page, page, total, next_cursor, prev_cursor):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def next_num(self):
+        return self.page + 1
+
+    @property
+    def prev_num(self):
+        return max(self.page - 1, 1)
+
+    @property
+    def pages(self):
+        if not self.total:
+            return 1
+        return math.ceil(self.total / self.per_page)
+
+
+def encode_cursor(values, tag=None):
+    """tag 를 주면 커서 앞에 같이 넣는다 (정렬 기준처럼 커서가 유효한 조건)."""
+    values = [v.isoformat() if isinstance(v, (datetime, date)) else v for v in values]
+    raw = json.dumps(values if tag is None else [tag, *values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns, tag=None):
+    """tag 가 만들 때와 다르면 (다른 정렬의 커서 등) 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if tag is not None:
+            if not isinstance(values, list) or not values or values[0] != tag:
+                raise ValueError(cursor)
+            values = values[1:]
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        decoded = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError):
+        abort(400)
+
+
+def keyset_paginate(query, columns, after=None, before=None, page=1, per_page=30,
+                    total=None, descending=True, tag=None):
+    """columns 순서로 정렬된 query 를 OFFSET 없이 한 페이지만 가져온다.
+
+    columns 의 마지막 항목은 유일해야 한다 (보통 id). after 커서가 있으면 다음 페이지,
+    before 커서가 있으면 이전 페이지를 찾는다. 어느 쪽이든 인덱스 seek 한 번이라
+    깊은 페이지도 첫 페이지와 비용이 같다. 정렬 기준을 고를 수 있으면 tag 로 커서에 넣는다.
+    """
+    keys = tuple_(*columns)
+    backwards = before is not None
+    cursor = before if backwards else after
+
+    if cursor:
+        values = tuple_(*decode_cursor(cursor, columns, tag), types=[c.type for c in columns])
+        # 내림차순에서 '다음'은 더 작은 값, '이전'은 더 큰 값
+        if descending != backwards:
+            query = query.filter(keys < values)
+        else:
+            query = query.filter(keys > values)
+    else:
+        page = 1
+
+    if descending != backwards:
+        query = query.order_by(*[c.desc() for c in columns])
+    else:
+        query = query.order_by(*[c.asc() for c in columns])
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_of(item):
+        return encode_cursor([getattr(item, c.key) for c in columns], tag)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = cursor_of(rows[-1])
+        if (has_more and backwards) or (cursor and not backwards):
+            prev_cursor = cursor_of(rows[0])
+
+    return KeysetPage(rows, per_page, max(page, 1), total, next_cursor, prev_cursor)
+
+
+_count_cache = {}
+
+
+def cached_count(key, query, ttl=60):
+    """COUNT(*) 결과를 ttl 초 동안 프로세스 메모리에 보관한다. 페이저 표시용 근사치."""
+    now = time.monotonic()
+    hit = _count_cache.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+    total = query.order_by(None).count()
+    _count_cache[key] = (now + ttl, total)
+    return total
+
+
+def forget_count(key):
+    _count_cache.pop(key, None)
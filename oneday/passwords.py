@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordBusy(ServiceUnavailable):
+    """동시에 계산 중인 해시가 PASSWORD_MAX_CONCURRENT 를 넘어 기다리다 포기함 -> 503."""
+    description = "로그인 요청이 많습니다. 잠시 후 다시 시도해 주세요."
+
+
+class _Hasher:
+    def __init__(self, config):
+        self.method = config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        # 저장되는 접두어: werkzeug 는 'scrypt' -> 'scrypt:32768:8:1' 처럼 기본 파라미터를 붙여 저장한다
+        self.prefix = generate_password_hash('x', self.method).split('$', 1)[0]
+        self.wait = config.get('PASSWORD_WAIT_SECONDS', 2.0)
+        self.slots = threading.BoundedSemaphore(config.get('PASSWORD_MAX_CONCURRENT', 4))
+        workers = config.get('PASSWORD_WORKERS', 0)
+        # hashlib 의 scrypt/pbkdf2 는 계산 중 GIL 을 놓으므로 스레드 풀로도 나뉜다
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='password') if workers else None
+
+    def run(self, func, *args):
+        if not self.slots.acquire(timeout=self.wait):
+            raise PasswordBusy(retry_after=int(self.wait) + 1)
+        try:
+            if self.executor is None:
+                return func(*args)
+            return self.executor.submit(func, *args).result()
+        finally:
+            self.slots.release()
+
+
+def init_app(app):
+    app.extensions['oneday_passwords'] = _Hasher(app.config)
+
+
+def _hasher():
+    return current_app.extensions['oneday_passwords']
+
+
+def hash_password(password):
+    hasher = _hasher()
+    return hasher.run(generate_password_hash, password, hasher.method)
+
+
+def verify(pwhash, password):
+    return _hasher().run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """저장된 해시의 방식/파라미터('scrypt:32768:8:1' 부분)가 현재 설정과 다르면 True."""
+    return pwhash.split('$', 1)[0] != _hasher().prefix
@@ -0,0 +1,209 @@
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import g, request
+from flask_login import current_user
+from werkzeug.exceptions import TooManyRequests
+from werkzeug.utils import import_string
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimited(TooManyRequests):
+    """한도를 넘음 -> 429 + Retry-After. DB 를 건드리기 전에 before_request 에서 끊는다."""
+    description = "요청이 너무 많습니다. 잠시 후 다시 시도해 주세요."
+
+
+def parse_rate(spec):
+    """'10/minute' -> (용량 10, 초당 충전량 10/60). 처음엔 10번 몰아서, 그 뒤로는 1분에 10번."""
+    count, _, period = spec.partition("/")
+    count = int(count)
+    return count, count / PERIODS[period.strip()]
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def _consume(buckets, levels):
+    """모든 버킷에 토큰이 있을 때만 하나씩 쓴다 (한 규칙에 걸리면 다른 규칙의 토큰도 남긴다).
+
+    반환값은 (쓴 뒤 토큰 목록, 기다릴 초). 기다릴 초가 0 이면 허용.
+    """
+    wait = max(((1 - tokens) / rate for tokens, (_, _, rate) in zip(levels, buckets) if tokens < 1), default=0.0)
+    return ([tokens - 1 for tokens in levels] if not wait else levels), wait
+
+
+class MemoryBackend:
+    """워커(프로세스) 안에서만 센다. 워커가 N 개면 실제 한도는 최대 N 배이고, 동시 처리 수도 워커별."""
+
+    def __init__(self, config):
+        self.maxsize = config.get("RATELIMIT_MAXSIZE", 10000)
+        self._buckets = OrderedDict()  # key -> (tokens, updated), 오래 안 쓴 것부터 밀려난다
+        self._lock = threading.Lock()
+        self._slots = {}
+
+    def take(self, buckets, now):
+        """buckets: [(key, 용량, 초당 충전량)]. 반환값은 0 (허용) 또는 다음 토큰까지 기다릴 초."""
+        with self._lock:
+            levels = [_refill(*self._buckets.pop(key, (capacity, now)), capacity, rate, now)
+                      for key, capacity, rate in buckets]
+            levels, wait = _consume(buckets, levels)
+            for (key, _, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def acquire(self, name, limit, wait, lease):
+        with self._lock:
+            slots = self._slots.setdefault(name, threading.BoundedSemaphore(limit))
+        return name if slots.acquire(timeout=wait) else None
+
+    def release(self, name, token):
+        self._slots[name].release()
+
+
+class SQLiteBackend:
+    """같은 호스트의 gunicorn 워커들이 SQLite 파일 하나(RATELIMIT_SQLITE_PATH)를 같이 쓴다.
+
+    /dev/shm 에 두면 디스크를 타지 않는다. 앱 DB 와는 별개라 한도 검사가 앱 DB 의 쓰기 잠금과 겹치지 않는다.
+    """
+
+    def __init__(self, config):
+        self.path = config["RATELIMIT_SQLITE_PATH"]
+        self._local = threading.local()
+
+    def _conn(self):
+        # 스레드마다, 그리고 fork 뒤에는 새 연결 (preload 된 마스터의 연결을 물려받지 않게)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # 잃어도 되는 값
+            conn.execute("CREATE TABLE IF NOT EXISTS bucket "
+                         "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS lease "
+                         "(token TEXT PRIMARY KEY, name TEXT NOT NULL, expires REAL NOT NULL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, buckets, now):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            for key, capacity, rate in buckets:
+                row = conn.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+                levels.append(_refill(*(row or (capacity, now)), capacity, rate, now))
+            levels, wait = _consume(buckets, levels)
+            conn.executemany("INSERT INTO bucket (key, tokens, updated) VALUES (?, ?, ?) "
+                             "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                             [(key, tokens, now) for (key, _, _), tokens in zip(buckets, levels)])
+            if random.random() < 0.001:  # 하루 넘게 안 쓴 버킷 정리
+                conn.execute("DELETE FROM bucket WHERE updated < ?", (now - 86400,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, name, limit, wait, lease):
+        """모든 워커를 합쳐 limit 개까지. 워커가 죽어 반납 못 한 자리는 lease 초 뒤에 풀린다."""
+        conn = self._conn()
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM lease WHERE name = ? AND expires < ?", (name, now))
+                (taken,) = conn.execute("SELECT count(*) FROM lease WHERE name = ?", (name,)).fetchone()
+                if taken < limit:
+                    conn.execute("INSERT INTO lease (token, name, expires) VALUES (?, ?, ?)", (token, name, now + lease))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            if taken < limit:
+                return token
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.02)
+
+    def release(self, name, token):
+        self._conn().execute("DELETE FROM lease WHERE token = ?", (token,))
+
+
+BACKENDS = {"memory": MemoryBackend, "sqlite": SQLiteBackend}
+
+
+def _identity(kind):
+    """규칙의 키 종류 -> 이번 요청의 식별자. 없으면 None (그 규칙은 건너뛴다)."""
+    if kind == "ip":
+        return request.remote_addr
+    if kind == "user":
+        # get_id() 는 '아이디:세션버전' 이라 로그아웃/재로그인마다 바뀐다: 아이디로만 센다
+        return str(current_user.id) if current_user.is_authenticated else None
+    if kind.startswith("form:"):
+        # 로그인 아이디처럼 본문 값으로 센다. 폼을 여기서 읽으므로 스트리밍 업로드 화면에는 쓰지 않는다
+        value = request.form.get(kind[len("form:"):], "").strip().lower()
+        return value or None
+    raise ValueError(f"알 수 없는 RATELIMIT_RULES 키: {kind}")
+
+
+def init_app(app):
+    """RATELIMIT_RULES 의 엔드포인트는 요청 수를, ADMISSION_ENDPOINTS 는 동시 처리 수를 제한한다."""
+    config = app.config
+    if not config.get("RATELIMIT_ENABLED", True):
+        return
+    name = config.get("RATELIMIT_BACKEND", "memory")
+    backend = (BACKENDS[name] if name in BACKENDS else import_string(name))(config)
+    app.extensions["oneday_ratelimit"] = backend
+
+    methods = set(config.get("RATELIMIT_METHODS", ("POST",)))
+    rules = {
+        endpoint: [(kind, *parse_rate(spec)) for kind, spec in rule.items()]
+        for endpoint, rule in config.get("RATELIMIT_RULES", {}).items()
+    }
+    admission = set(config.get("ADMISSION_ENDPOINTS", ()))
+    max_concurrent = config.get("ADMISSION_MAX_CONCURRENT", 8)
+    admission_wait = config.get("ADMISSION_WAIT_SECONDS", 0.5)
+    lease = config.get("ADMISSION_LEASE_SECONDS", 60)
+
+    @app.before_request
+    def _admit():
+        if request.method not in methods:
+            return
+        endpoint = request.endpoint
+        buckets = []
+        for kind, capacity, rate in rules.get(endpoint, ()):
+            ident = _identity(kind)
+            if ident is not None:
+                buckets.append((f"{endpoint}:{kind}:{ident}", capacity, rate))
+        if buckets:
+            wait = backend.take(buckets, time.time())
+            if wait:
+                logger.info("요청 수 제한 %s %s (%.1f초 뒤)", endpoint, request.remote_addr, wait)
+                raise RateLimited(retry_after=math.ceil(wait))
+        if endpoint in admission:
+            token = backend.acquire("admission", max_concurrent, admission_wait, lease)
+            if token is None:
+                logger.warning("동시 처리 한도 %d 초과: %s", max_concurrent, endpoint)
+                raise RateLimited(retry_after=1)
+            g.admission_token = token
+
+    @app.teardown_request
+    def _release(exc):
+        token = g.pop("admission_token", None)
+        if token is not None:
+            backend.release("admission", token)
@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import os
+
+from flask import request
+
+from oneday.uploads import IMMUTABLE_MAX_AGE, fingerprint
+
+try:
+    import brotli
+except ImportError:  # 없으면 gzip 만 쓴다
+    brotli = None
+
+COMPRESSIBLE = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml',
+}
+
+# (경로, ETag, 인코딩) -> 압축된 본문. 정적 파일과 전체 페이지 캐시(oneday.pagecache)
+# 응답은 내용이 ETag 로 고정되므로 매번 다시 압축하지 않는다
+_compressed = {}
+
+
+def _encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.get('COMPRESS_BR_QUALITY', 5))
+    return gzip.compress(data, compresslevel=config.get('COMPRESS_LEVEL', 6), mtime=0)
+
+
+def _static_version(values):
+    # url_for('static', filename=...) 에 내용 해시 ?v= 를 붙인다
+    from flask import current_app
+
+    path = os.path.join(current_app.static_folder, values['filename'])
+    version = fingerprint(path)
+    if version:
+        values['v'] = version
+
+
+def init_app(app):
+    """렌더링된 페이지의 약한 ETag/304, gzip·brotli 압축, 정적 파일 URL 버전/장기 캐시.
+
+    after_request 는 등록 역순으로 실행되므로 다른 훅보다 먼저 등록해 마지막에 돌게 한다.
+    """
+    config = app.config
+    min_size = config.get('COMPRESS_MIN_SIZE', 500)
+
+    @app.url_defaults
+    def _version_static(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            _static_version(values)
+
+    @app.after_request
+    def _finish(response):
+        static = request.endpoint == 'static'
+        if static and request.args.get('v') and response.status_code in (200, 304):
+            path = os.path.join(app.static_folder, request.view_args['filename'])
+            if request.args['v'] == fingerprint(path):
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = IMMUTABLE_MAX_AGE
+                response.cache_control.immutable = True
+
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        if response.mimetype not in COMPRESSIBLE or 'Content-Encoding' in response.headers:
+            return response
+        if response.direct_passthrough and not static:
+            return response
+        if response.is_streamed and not response.direct_passthrough:
+            return response
+        if 'Range' in request.headers:
+            return response
+
+        if static:
+            response.direct_passthrough = False
+        data = response.get_data()
+
+        # 렌더링된 페이지: 본문 해시로 약한 ETag (압축 여부와 상관없이 같은 값)
+        if response.mimetype == 'text/html':
+            if not response.get_etag()[0]:
+                response.set_etag(hashlib.sha1(data).hexdigest(), weak=True)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = _encoding()
+        if encoding is None or len(data) < min_size:
+            return response
+
+        if static or getattr(response, 'reuse_compressed', False):
+            key = (request.path, response.get_etag()[0], encoding)
+            compressed = _compressed.get(key)
+            if compressed is None:
+                compressed = _compressed[key] = _compress(data, encoding, config)
+        else:
+            compressed = _compress(data, encoding, config)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # 압축본과 원본이 같은 강한 ETag 를 쓰면 안 되므로 약한 ETag 로 (304 비교는 그대로 된다)
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,148 @@
+from markupsafe import Markup, escape
+from sqlalchemy import DateTime, Integer, String, event, text
+
+from oneday import db
+
+# 질문 1건 = FTS 1행 (rowid = question.id). 답변 본문은 answers 컬럼에 이어 붙인다.
+# trigram 토크나이저라 띄어쓰기/조사와 상관없이 한국어 부분 문자열이 검색된다.
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS question_fts
+    USING fts5(subject, content, answers, tokenize='trigram')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS question_fts_ai AFTER INSERT ON question BEGIN
+        INSERT INTO question_fts(rowid, subject, content, answers)
+        VALUES (new.id, new.subject, new.content, '');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS question_fts_au AFTER UPDATE OF subject, content ON question BEGIN
+        UPDATE question_fts SET subject = new.subject, content = new.content WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS question_fts_ad AFTER DELETE ON question BEGIN
+        DELETE FROM question_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS answer_fts_ai AFTER INSERT ON answer BEGIN
+        UPDATE question_fts SET answers = (
+            SELECT group_concat(content, char(10)) FROM answer WHERE question_id = new.question_id
+        ) WHERE rowid = new.question_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS answer_fts_au AFTER UPDATE OF content ON answer BEGIN
+        UPDATE question_fts SET answers = (
+            SELECT group_concat(content, char(10)) FROM answer WHERE question_id = new.question_id
+        ) WHERE rowid = new.question_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS answer_fts_ad AFTER DELETE ON answer BEGIN
+        UPDATE question_fts SET answers = coalesce((
+            SELECT group_concat(content, char(10)) FROM answer WHERE question_id = old.question_id
+        ), '') WHERE rowid = old.question_id;
+    END
+    """,
+]
+
+# snippet() 결과를 escape 한 뒤에 <mark> 로 바꾸기 위한 구분 문자
+_HL_START, _HL_END = '\x02', '\x03'
+
+# 제목 > 본문 > 답변 순으로 가중치
+_BM25 = 'bm25(question_fts, 10.0, 5.0, 1.0)'
+
+TRIGRAM = 3
+
+
+def install(connection):
+    """FTS 테이블과 동기화 트리거를 만든다. SQLite 가 아니면 아무것도 하지 않는다."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for ddl in FTS_DDL:
+        connection.execute(text(ddl))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_after_create(target, connection, **kw):
+    install(connection)
+
+
+def rebuild():
+    """기존 질문/답변으로 색인을 통째로 다시 만든다. 반환값은 색인된 질문 수."""
+    if db.engine.dialect.name != 'sqlite':
+        return 0
+    db.session.execute(text('DELETE FROM question_fts'))
+    result = db.session.execute(text("""
+        INSERT INTO question_fts(rowid, subject, content, answers)
+        SELECT q.id, q.subject, q.content, coalesce((
+            SELECT group_concat(a.content, char(10)) FROM answer a WHERE a.question_id = q.id
+        ), '')
+        FROM question q
+    """))
+    db.session.execute(text("INSERT INTO question_fts(question_fts) VALUES ('optimize')"))
+    db.session.commit()
+    return result.rowcount
+
+
+def _highlight(snippet):
+    return Markup(
+        str(escape(snippet)).replace(_HL_START, '<mark>').replace(_HL_END, '</mark>')
+    )
+
+
+def short_terms(keyword):
+    """trigram 색인으로 찾을 수 없는 3글자 미만 단어들."""
+    return [t for t in keyword.split() if len(t) < TRIGRAM]
+
+
+def search(keyword, limit=30, offset=0):
+    """keyword 의 모든 단어를 포함하는 질문을 관련도순으로 돌려준다.
+
+    trigram 은 3글자 미만 단어를 MATCH 로 찾을 수 없다. 그런 단어가 있으면 전체를
+    훑지 않고 빈 결과를 돌려준다 (화면에서 short_terms() 로 먼저 안내한다).
+    """
+    terms = keyword.split()
+    if not terms:
+        return []
+
+    if db.engine.dialect.name != 'sqlite':
+        return _search_without_fts(terms, limit, offset)
+
+    if short_terms(keyword):
+        return []
+
+    stmt = text(f"""
+        SELECT q.id, q.subject, q.create_date, q.answer_count,
+               snippet(question_fts, -1, :hs, :he, '…', 16) AS snippet
+        FROM question_fts JOIN question q ON q.id = question_fts.rowid
+        WHERE question_fts MATCH :match
+        ORDER BY {_BM25}
+        LIMIT :limit OFFSET :offset
+    """).columns(id=Integer, subject=String, create_date=DateTime, answer_count=Integer, snippet=String)
+    params = {
+        'match': ' '.join('"{}"'.format(t.replace('"', '""')) for t in terms),
+        'limit': limit, 'offset': offset, 'hs': _HL_START, 'he': _HL_END,
+    }
+    rows = db.session.execute(stmt, params).mappings().all()
+
+    return [dict(row, snippet=_highlight(row['snippet'])) for row in rows]
+
+
+def _search_without_fts(terms, limit, offset):
+    """FTS5 가 없는 DB(PostgreSQL 등)용: 제목/본문 ILIKE, 최신순."""
+    from oneday.models import Question
+
+    query = Question.query
+    for t in terms:
+        pattern = '%{}%'.format(t.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+        query = query.filter(Question.subject.ilike(pattern, escape='\\') | Question.content.ilike(pattern, escape='\\'))
+    rows = query.order_by(Question.create_date.desc()).limit(limit).offset(offset).all()
+    return [
+        {'id': q.id, 'subject': q.subject, 'create_date': q.create_date,
+         'answer_count': q.answer_count, 'snippet': escape(q.content[:80])}
+        for q in rows
+    ]
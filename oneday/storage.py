@@ -0,0 +1,439 @@
+import contextlib
+import datetime
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+from itertools import chain
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import case, event, func, inspect, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from werkzeug.utils import import_string, secure_filename
+
+from oneday import db
+
+try:
+    import boto3
+except ImportError:  # s3 백엔드를 쓸 때만 필요하다
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+# 업로드 원본은 내용(sha256)으로 이름을 짓는다: cas/ab/<sha256>.jpg
+# 썸네일 등 변형(oneday.images)은 같은 자리에 cas/ab/<sha256>_thumb.webp 로 생긴다
+PREFIX = "cas/"
+CHUNK_SIZE = 256 * 1024
+_KEY_RE = re.compile(r"^cas/[0-9a-f]{2}/([0-9a-f]{64})")
+
+cli = AppGroup("storage", help="업로드 파일 저장소 (내용 주소, 중복 제거, 정리)")
+
+
+def is_content_key(key):
+    return bool(key) and _KEY_RE.match(key) is not None
+
+
+def digest_of(key):
+    match = _KEY_RE.match(key or "")
+    return match.group(1) if match else None
+
+
+class LocalBackend:
+    """UPLOAD_FOLDER 아래 파일로 저장한다."""
+
+    is_local = True
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def save(self, key, src):
+        """임시 파일 src 를 key 로 옮긴다. 같은 파일시스템이면 rename 한 번."""
+        dest = self.path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.move(src, dest)
+
+    def open(self, key):
+        return open(self.path(key), "rb")
+
+    def touch(self, key):
+        os.utime(self.path(key))
+
+    def modified(self, key):
+        try:
+            return datetime.datetime.fromtimestamp(os.stat(self.path(key)).st_mtime)
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path(key))
+
+    def keys(self, prefix):
+        """prefix 아래 모든 파일의 key."""
+        base = self.path(prefix.rstrip("/"))
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                rel = os.path.relpath(os.path.join(dirpath, name), self.root)
+                yield rel.replace(os.sep, "/")
+
+
+def _missing(error):
+    code = str(getattr(error, "response", {}).get("Error", {}).get("Code", ""))
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+class S3Backend:
+    """S3 호환 저장소 (AWS S3, MinIO, R2 ...). client 는 boto3 의 s3 client 와 같은 메서드를 가지면 된다."""
+
+    is_local = False
+
+    def __init__(self, client, bucket, prefix=""):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def path(self, key):
+        return None
+
+    def exists(self, key):
+        return self.modified(key) is not None
+
+    def save(self, key, src):
+        self.client.upload_file(src, self.bucket, self.prefix + key)
+        os.remove(src)
+
+    def open(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"]
+        except Exception as e:
+            if _missing(e):
+                raise FileNotFoundError(key) from None
+            raise
+
+    def touch(self, key):
+        # 자기 자신으로 복사하면 LastModified 가 갱신된다 (정리 유예 시간을 다시 센다)
+        name = self.prefix + key
+        self.client.copy_object(Bucket=self.bucket, Key=name, CopySource={"Bucket": self.bucket, "Key": name},
+                                MetadataDirective="REPLACE")
+
+    def modified(self, key):
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except Exception as e:
+            if _missing(e):
+                return None
+            raise
+        return head["LastModified"].astimezone().replace(tzinfo=None)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def keys(self, prefix):
+        token = None
+        while True:
+            kwargs = {"Bucket": self.bucket, "Prefix": self.prefix + prefix}
+            if token:
+                kwargs["ContinuationToken"] = token
+            page = self.client.list_objects_v2(**kwargs)
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix):]
+            if not page.get("IsTruncated"):
+                return
+            token = page["NextContinuationToken"]
+
+
+class LocalS3Error(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class LocalS3Client:
+    """S3Backend 가 쓰는 s3 client 메서드만 디렉터리로 흉내 낸다 (개발/테스트용, STORAGE_BACKEND=s3-local)."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def upload_file(self, filename, bucket, key):
+        dest = self._path(bucket, key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copyfile(filename, dest)
+
+    def head_object(self, Bucket, Key):
+        try:
+            st = os.stat(self._path(Bucket, Key))
+        except FileNotFoundError:
+            raise LocalS3Error("404") from None
+        return {"ContentLength": st.st_size,
+                "LastModified": datetime.datetime.fromtimestamp(st.st_mtime, datetime.timezone.utc)}
+
+    def get_object(self, Bucket, Key):
+        try:
+            return {"Body": open(self._path(Bucket, Key), "rb")}
+        except FileNotFoundError:
+            raise LocalS3Error("NoSuchKey") from None
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective="COPY"):
+        src = self._path(CopySource["Bucket"], CopySource["Key"])
+        dest = self._path(Bucket, Key)
+        if src == dest:
+            os.utime(dest)
+        else:
+            self.upload_file(src, Bucket, Key)
+
+    def delete_object(self, Bucket, Key):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(Bucket, Key))
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None, MaxKeys=1000):
+        base = os.path.join(self.root, Bucket)
+        names = sorted(
+            os.path.relpath(os.path.join(dirpath, name), base).replace(os.sep, "/")
+            for dirpath, _, filenames in os.walk(base) for name in filenames
+        )
+        names = [n for n in names if n.startswith(Prefix) and (ContinuationToken is None or n > ContinuationToken)]
+        page = names[:MaxKeys]
+        return {"Contents": [{"Key": n} for n in page], "IsTruncated": len(names) > MaxKeys,
+                "NextContinuationToken": page[-1] if page else None}
+
+
+def _make_backend(app):
+    config = app.config
+    name = config.get("STORAGE_BACKEND", "local")
+    if name == "local":
+        return LocalBackend(config["UPLOAD_FOLDER"])
+    if name == "s3-local":
+        return S3Backend(LocalS3Client(config["STORAGE_S3_LOCAL_DIR"]), config.get("S3_BUCKET") or "oneday",
+                         config.get("S3_PREFIX", ""))
+    if name == "s3":
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 를 쓰려면 boto3 를 설치해야 합니다.")
+        client = boto3.client("s3", endpoint_url=config.get("S3_ENDPOINT_URL"),
+                              region_name=config.get("S3_REGION"))
+        return S3Backend(client, config["S3_BUCKET"], config.get("S3_PREFIX", ""))
+    return import_string(name)(config)
+
+
+def init_app(app):
+    """STORAGE_BACKEND: local / s3 / s3-local, 또는 config 를 받는 백엔드 클래스 경로."""
+    app.extensions["oneday_storage"] = _make_backend(app)
+    app.cli.add_command(cli)
+
+
+def get_backend():
+    return current_app.extensions["oneday_storage"]
+
+
+def put(stream, filename, backend=None, tmp_dir=None):
+    """stream 을 CHUNK_SIZE 씩 임시 파일에 쓰면서 sha256 을 계산하고, 내용 주소 key 로 저장한다.
+
+    같은 내용이 이미 있으면 새로 쓰지 않고 기존 key 를 돌려준다. DB 는 건드리지 않으므로
+    (참조 수는 행이 flush 될 때 센다) 앱 컨텍스트 밖의 스레드에서도 backend 를 넘겨 쓸 수 있다.
+    """
+    from oneday import images
+    backend = backend or get_backend()
+    if hasattr(stream, "take"):  # oneday.uploads.StagedFile: 요청을 받으면서 이미 임시 파일에 쓰고 해시했다
+        tmp, digest, ext = stream.take()
+    else:
+        tmp_dir = tmp_dir or current_app.config["UPLOAD_FOLDER"]
+        os.makedirs(tmp_dir, exist_ok=True)
+        _, ext = os.path.splitext(secure_filename(filename or ""))
+        h = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    h.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        digest = h.hexdigest()
+    try:
+        # 저장 뒤에는 내용이 바뀌면 안 되므로 EXIF/GPS 는 key 를 정하기 전에 지운다 (디코딩 없이 세그먼트만)
+        digest = images.strip_metadata(tmp) or digest
+        key = f"{PREFIX}{digest[:2]}/{digest}{ext.lower()}"
+        if backend.exists(key):
+            backend.touch(key)  # 정리(gc) 유예 시간을 다시 센다
+            os.remove(tmp)
+        else:
+            backend.save(key, tmp)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+    return key
+
+
+@contextlib.contextmanager
+def local_copy(key, backend=None):
+    """key 를 로컬 파일로 쓸 수 있는 (root, key) 로 돌려준다. 원격 백엔드면 임시 디렉터리에 받아 둔다."""
+    backend = backend or get_backend()
+    if backend.is_local:
+        yield backend.root
+        return
+    with tempfile.TemporaryDirectory() as root:
+        dest = os.path.join(root, *key.split("/"))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with backend.open(key) as src, open(dest, "wb") as out:
+            shutil.copyfileobj(src, out, CHUNK_SIZE)
+        yield root
+
+
+# 참조 수 ---------------------------------------------------------------------
+
+def _referencing_columns():
+    from oneday.models import Course, CourseImage, Question
+    return {CourseImage: ("path", CourseImage.path), Course: ("image_path", Course.image_path),
+            Question: ("image_path", Question.image_path)}
+
+
+def recount(connection, keys):
+    """keys 의 참조 수를 CourseImage.path / Course.image_path / Question.image_path 에서 다시 센다."""
+    from oneday.models import StoredFile
+    keys = sorted(k for k in keys if is_content_key(k))
+    if not keys:
+        return
+    now = datetime.datetime.now().replace(microsecond=0)
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    connection.execute(
+        dialect.insert(StoredFile)
+        .values([{"key": k, "refs": 0, "created_at": now, "updated_at": now} for k in keys])
+        .on_conflict_do_nothing(index_elements=[StoredFile.key])
+    )
+    refs = sum(
+        db.select(func.count()).where(column == StoredFile.key).scalar_subquery()
+        for _, column in _referencing_columns().values()
+    )
+    # updated_at 은 수가 바뀔 때만 (gc 의 전체 재계산이 유예 시간을 매번 되돌리지 않도록)
+    connection.execute(
+        update(StoredFile).where(StoredFile.key.in_(keys))
+        .values(refs=refs, updated_at=case((StoredFile.refs != refs, now), else_=StoredFile.updated_at))
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _recount_flushed(session, flush_context):
+    """업로드 경로를 가진 행이 추가/변경/삭제되면 같은 트랜잭션에서 그 파일들의 참조 수를 고친다."""
+    columns = _referencing_columns()
+    keys = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        spec = columns.get(type(obj))
+        if spec is None:
+            continue
+        history = inspect(obj).attrs[spec[0]].history
+        keys.update(chain(history.added, history.unchanged, history.deleted))
+    if any(is_content_key(k) for k in keys):
+        recount(session.connection(), keys)
+
+
+# 정리 -------------------------------------------------------------------------
+
+def _variant_keys(key):
+    from oneday.images import VARIANTS, _variant_path
+    return [_variant_path(key, name) for name in VARIANTS]
+
+
+def collect_garbage(grace_seconds=3600, legacy=False, dry_run=False, echo=print):
+    """참조가 없는 파일(과 변형)을 지운다. 반환값은 지운 원본 수.
+
+    1) stored_file 전체의 참조 수를 다시 센다 (DB 의 ON DELETE CASCADE 처럼 ORM 을 거치지 않은 삭제 보정)
+    2) 참조 0 인 채로 grace_seconds 가 지난 파일을 지운다. 방금 같은 내용이 다시 올라왔으면
+       put() 이 파일 시각을 갱신해 두므로 건너뛴다
+    3) 저장소에는 있는데 stored_file 에 없는 파일 (저장 후 폼 검증 실패 등) 도 유예 후 지운다
+    4) legacy 면 내용 주소 이전의 courses/ 파일 중 어디서도 참조하지 않는 것도 지운다
+    """
+    from oneday.models import StoredFile
+    backend = get_backend()
+    cutoff = datetime.datetime.now() - datetime.timedelta(seconds=grace_seconds)
+    chunk = current_app.config.get("JOBS_CHUNK_SIZE", 500)
+
+    after = ""
+    while True:
+        keys = db.session.scalars(
+            db.select(StoredFile.key).where(StoredFile.key > after).order_by(StoredFile.key).limit(chunk)
+        ).all()
+        if not keys:
+            break
+        recount(db.session.connection(), keys)
+        db.session.commit()
+        after = keys[-1]
+
+    removed = 0
+
+    def remove(key):
+        nonlocal removed
+        removed += 1
+        echo(f"삭제: {key}")
+        if not dry_run:
+            for k in [key] + _variant_keys(key):
+                backend.delete(k)
+
+    for key in db.session.scalars(
+        db.select(StoredFile.key).where(StoredFile.refs == 0, StoredFile.updated_at < cutoff)
+    ).all():
+        modified = backend.modified(key)
+        if modified is not None and modified >= cutoff:
+            continue
+        remove(key)
+        if not dry_run:
+            db.session.execute(db.delete(StoredFile).where(StoredFile.key == key, StoredFile.refs == 0))
+            db.session.commit()
+
+    known = {digest_of(k) for k in db.session.scalars(db.select(StoredFile.key))}
+    unknown = {}
+    for key in backend.keys(PREFIX):
+        digest = digest_of(key)
+        if digest is not None and digest not in known:
+            unknown.setdefault(digest, []).append(key)
+    for digest, keys in unknown.items():
+        # 원본은 cas/ab/<sha>.jpg, 변형은 cas/ab/<sha>_thumb.webp. 원본이 없으면 남은 변형만 지운다
+        originals = [k for k in keys if not k.split(digest, 1)[1].startswith("_")]
+        if any((backend.modified(k) or cutoff) >= cutoff for k in originals):
+            continue
+        removed += len(originals)
+        echo(f"삭제: {', '.join(keys)}")
+        if not dry_run:
+            for key in keys:
+                backend.delete(key)
+
+    if legacy:
+        referenced = set()
+        for _, column in _referencing_columns().values():
+            referenced.update(db.session.scalars(db.select(column).where(column.isnot(None))))
+        referenced.update(chain.from_iterable(_variant_keys(r) for r in list(referenced)))
+        for key in list(backend.keys("courses/")):
+            if key in referenced:
+                continue
+            modified = backend.modified(key)
+            if modified is not None and modified < cutoff:
+                removed += 1
+                echo(f"삭제: {key}")
+                if not dry_run:
+                    backend.delete(key)
+    return removed
+
+
+@cli.command("gc")
+@click.option("--grace", default=None, type=int, help="참조가 끊긴 뒤 이만큼(초) 지난 파일만 지운다")
+@click.option("--legacy", is_flag=True, help="내용 주소 이전 courses/ 파일 중 참조 없는 것도 지운다")
+@click.option("--dry-run", is_flag=True, help="지울 파일만 보여 준다")
+def gc_command(grace, legacy, dry_run):
+    """참조가 없는 업로드 파일을 지운다."""
+    grace = current_app.config.get("STORAGE_GC_GRACE", 3600) if grace is None else grace
+    removed = collect_garbage(grace, legacy, dry_run, echo=click.echo)
+    click.echo(f"지울 파일 {removed}개 (--dry-run)" if dry_run else f"{removed}개 파일을 지웠습니다.")
@@ -0,0 +1,279 @@
+import contextlib
+import functools
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+
+from flask import Request, current_app, request, send_file, send_from_directory, url_for, abort, make_response
+from werkzeug.security import safe_join
+
+from oneday import storage
+
+logger = logging.getLogger(__name__)
+
+# 버전(?v=해시)이 붙은 URL 은 내용이 바뀌면 URL 도 바뀌므로 1년 캐시
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+DEFAULT_MAX_AGE = 3600
+
+# fingerprint 가 기억하는 파일 수. 파일이 바뀌면 키가 달라지므로 오래된 항목은 LRU 로 밀려난다
+FINGERPRINT_CACHE_SIZE = 4096
+
+# 받는 이미지 형식: 파일 앞부분(매직 바이트) -> 저장할 확장자. 이름의 확장자는 믿지 않는다
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+SNIFF_BYTES = max(len(magic) for magic, _ in IMAGE_SIGNATURES)
+
+
+def sniff_image(head):
+    for magic, ext in IMAGE_SIGNATURES:
+        if head.startswith(magic):
+            return ext
+    return None
+
+
+class StagedFile:
+    """multipart 파일 부분을 받는 대로 저장소 임시 파일에 쓰는 stream (werkzeug 의 stream_factory 자리).
+
+    메모리에는 werkzeug 파서의 버퍼(64KB)만 올라오고, 쓰는 동안 sha256 / 크기 / 매직 바이트를
+    확인한다. 형식이 틀리거나 크기를 넘으면 error 를 남기고 나머지는 버린다 (폼 오류로 보여 주기 위해
+    요청을 끊지는 않는다). storage.put 이 take() 로 임시 파일을 그대로 넘겨받아 한 번 더 복사하지 않는다.
+    """
+
+    def __init__(self, tmp_dir, max_size, error=None):
+        self.max_size = max_size
+        self.error = error
+        self.size = 0
+        self.ext = None
+        self._head = b""
+        self._hash = hashlib.sha256()
+        self.path = None
+        self._file = None
+        if error is None:
+            os.makedirs(tmp_dir, exist_ok=True)
+            fd, self.path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+            self._file = os.fdopen(fd, "w+b")
+
+    def _reject(self, error):
+        self.error = error
+        self.discard()
+
+    def write(self, data):
+        if self.error:
+            return len(data)
+        self.size += len(data)
+        if self.size > self.max_size:
+            self._reject(f"파일이 너무 큽니다 (최대 {self.max_size // (1024 * 1024)}MB).")
+            return len(data)
+        if self.ext is None:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+                if self.error:
+                    return len(data)
+        self._hash.update(data)
+        self._file.write(data)
+        return len(data)
+
+    def _sniff(self):
+        self.ext = sniff_image(self._head)
+        if self.ext is None:
+            self._reject("이미지 파일(jpg, png, gif)만 업로드 가능합니다.")
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # 파서가 다 쓴 뒤 seek(0) 한다: 아주 작은 파일은 여기서 형식을 확인한다
+        if self.ext is None and not self.error and self.size:
+            self._sniff()
+        return self._file.seek(offset, whence) if self._file else 0
+
+    def read(self, size=-1):
+        return self._file.read(size) if self._file else b""
+
+    def tell(self):
+        return self._file.tell() if self._file else 0
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def take(self):
+        """(임시 파일 경로, sha256, 확장자). 이후 파일은 가져간 쪽 책임."""
+        self._file.close()
+        path, self.path, self._file = self.path, None, None
+        return path, self._hash.hexdigest(), self.ext
+
+    def discard(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self.path:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path)
+            self.path = None
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+class UploadRequest(Request):
+    """streamed_uploads 가 붙은 view 의 multipart 파일은 StagedFile 로 바로 디스크에 받는다."""
+
+    upload_policy = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.upload_policy is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return self.upload_policy.open(filename)
+
+
+class _UploadPolicy:
+    def __init__(self, tmp_dir, max_size, max_files):
+        self.tmp_dir = tmp_dir
+        self.max_size = max_size
+        self.max_files = max_files
+        self.staged = []
+        self.count = 0
+
+    def open(self, filename):
+        if filename:  # 파일을 고르지 않은 입력칸도 빈 부분으로 온다
+            self.count += 1
+        if self.count > self.max_files:
+            staged = StagedFile(self.tmp_dir, self.max_size, error=f"파일은 한 번에 {self.max_files}개까지 올릴 수 있습니다.")
+        else:
+            staged = StagedFile(self.tmp_dir, self.max_size)
+        self.staged.append(staged)
+        return staged
+
+
+def streamed_uploads(max_files=None):
+    """view 의 업로드 파일을 StagedFile 로 받게 한다. 폼(request.files)을 읽기 전에 적용돼야 한다."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            request.upload_policy = _UploadPolicy(
+                config["UPLOAD_FOLDER"],
+                config.get("UPLOAD_MAX_FILE_SIZE", 5 * 1024 * 1024),
+                max_files or config.get("UPLOAD_MAX_FILES", 5),
+            )
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def upload_error(files):
+    """StagedFile 로 받은 파일들 중 첫 오류 메시지 (없으면 None)."""
+    for f in files:
+        error = getattr(getattr(f, "stream", None), "error", None)
+        if error:
+            return error
+    return None
+
+
+def init_app(app):
+    app.request_class = UploadRequest
+
+    @app.teardown_request
+    def _discard_staged(exc):
+        # 저장소로 넘어가지 않은 임시 파일 (폼 오류, 예외 등) 정리
+        policy = request.upload_policy
+        if policy is not None:
+            for staged in policy.staged:
+                staged.discard()
+
+
+def clean_path(filename):
+    cleaned = filename.replace("\\", "/")
+    # 혹시 실수로 'uploads/'가 앞에 붙어 오면 제거
+    if cleaned.startswith("uploads/"):
+        cleaned = cleaned[len("uploads/"):]
+    return cleaned
+
+
+@functools.lru_cache(maxsize=FINGERPRINT_CACHE_SIZE)
+def _content_hash(full_path, mtime_ns, size):
+    h = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def fingerprint(full_path):
+    """파일 내용의 sha256 앞부분. 파일이 바뀌기 전까지는 stat 한 번으로 끝난다."""
+    try:
+        st = os.stat(full_path)
+        return _content_hash(full_path, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def upload_url(path):
+    """템플릿용: 내용 해시가 붙은 업로드 파일 URL. 원격 저장소면 파일을 열어 보지 않고 해시 없이."""
+    cleaned = clean_path(path)
+    version = None
+    if storage.get_backend().is_local:
+        full_path = safe_join(current_app.config["UPLOAD_FOLDER"], cleaned)
+        version = fingerprint(full_path) if full_path else None
+    return url_for("course.uploaded_file", filename=cleaned, v=version)
+
+
+def send_upload(filename):
+    """UPLOAD_FOLDER 의 파일을 강한 ETag/304/Range 를 지원하며 보낸다.
+
+    UPLOAD_SEND_MODE 가 'x-accel' 이면 본문은 프록시(nginx)가 보내도록
+    X-Accel-Redirect 헤더만 돌려주고, 'x-sendfile' 이면 X-Sendfile 을 쓴다.
+    """
+    folder = current_app.config["UPLOAD_FOLDER"]
+    cleaned = clean_path(filename)
+    backend = storage.get_backend()
+    if not backend.is_local:
+        return _send_remote(backend, cleaned)
+    full_path = safe_join(folder, cleaned)
+    version = fingerprint(full_path) if full_path else None
+    logger.debug("upload %s -> %s (etag=%s)", filename, full_path, version)
+    if version is None:
+        abort(404)
+
+    requested = request.args.get("v")
+    max_age = IMMUTABLE_MAX_AGE if requested == version else DEFAULT_MAX_AGE
+
+    if version in request.if_none_match:
+        response = make_response("", 304)
+    else:
+        mode = current_app.config.get("UPLOAD_SEND_MODE", "app")
+        if mode == "x-accel":
+            response = make_response("")
+            prefix = current_app.config.get("UPLOAD_ACCEL_PREFIX", "/_uploads/")
+            response.headers["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + cleaned
+            response.headers.pop("Content-Type", None)
+        else:
+            # x-sendfile 은 send_file 이 USE_X_SENDFILE 설정을 보고 처리한다
+            response = send_from_directory(folder, cleaned, etag=version, max_age=max_age)
+
+    response.set_etag(version)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if max_age == IMMUTABLE_MAX_AGE:
+        response.cache_control.immutable = True
+    return response
+
+
+def _send_remote(backend, key):
+    """원격 저장소(S3 등)의 파일을 앱이 받아서 그대로 흘려보낸다."""
+    if ".." in key.split("/"):
+        abort(404)
+    try:
+        body = backend.open(key)
+    except FileNotFoundError:
+        abort(404)
+    mimetype = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    response = send_file(body, mimetype=mimetype, max_age=DEFAULT_MAX_AGE, conditional=False, etag=False)
+    response.cache_control.public = True
+    return response
@@ -4,6 +4,7 @@ from flask_login import current_user, login_required
 from oneday import db
 from oneday.forms import AnswerForm
 from oneday.models import Question, Answer
+from oneday.views.question_views import render_detail, answer_page_url
 
 bp = Blueprint('answer', __name__, url_prefix='/answer')
 
@@ -14,11 +15,12 @@ def create(question_id):
     question = Question.query.get_or_404(question_id)
     if form.validate_on_submit():
         content = form.content.data
-        answer = Answer(content=content, create_date=datetime.now(), user=current_user)
-        question.answer_set.append(answer)
+        answer = Answer(content=content, create_date=datetime.now(), user=current_user, question=question)
+        db.session.add(answer)
+        question.answer_count = Question.answer_count + 1
         db.session.commit()
-        return redirect(url_for('question.detail', question_id=question_id))
-    return render_template('question/question_detail.html', question=question, form=form)
+        return redirect(answer_page_url(answer))
+    return render_detail(question_id, form)
 
 @bp.route('/modify/<int:answer_id>/', methods=['GET','POST'])
 @login_required
@@ -46,6 +48,7 @@ def delete(answer_id):
 
     # 삭제 전에 question_id 저장
     question_id = answer.question_id
+    answer.question.answer_count = Question.answer_count - 1
     db.session.delete(answer)
     db.session.commit()
     return redirect(url_for('question.detail', question_id=question_id))
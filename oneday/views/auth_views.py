@@ -1,8 +1,7 @@
 from flask import Blueprint, request, redirect, url_for, flash, render_template, make_response, session
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash
 
-from oneday import db
+from oneday import db, identity
 from oneday.forms import UserCreateForm, UserLoginForm
 from oneday.models import User
 
@@ -36,8 +35,8 @@ def signup():
                 user = User(
                     username=name,
                     email=email,
-                    password=generate_password_hash(password1)
                 )
+                user.set_password(password1)
                 db.session.add(user)
                 db.session.commit()
                 flash("회원가입이 완료되었습니다.", "success")
@@ -69,5 +68,7 @@ def login():
 @bp.route("/logout")
 @login_required
 def logout():
+    # 쿠키를 복사해 둔 다른 곳의 세션까지 끊기도록 세션 버전을 올린다
+    identity.revoke_sessions(current_user.id)
     session.clear()
     return redirect(url_for("auth.login"))
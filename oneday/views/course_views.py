@@ -1,12 +1,19 @@
+import hashlib
+import json
 import os
-import uuid
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory
-from werkzeug.utils import secure_filename
-from oneday import db
+import sys
+from datetime import datetime
+
+import click
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, abort
+from markupsafe import Markup
+from oneday import db, booking, cache, course_io, images, pagecache, storage, uploads
+from oneday.pagination import keyset_paginate
+from oneday.uploads import upload_url
 from oneday.models import Course, CourseImage
 from oneday.forms import CourseCreateForm
-from sqlalchemy.orm import selectinload, joinedload
-from flask_login import login_required
+from sqlalchemy.orm import selectinload, joinedload, noload
+from flask_login import current_user, login_required
 
 
 bp = Blueprint("course", __name__, url_prefix="/course")
@@ -19,35 +26,146 @@ def index():
 
 
 # 워크스페이스
+WORKSPACE_PER_PAGE = 24
+
+
+def invalidate_course_lists(is_published):
+    """해당 공개 상태의 코스가 보이는 워크스페이스 탭, 카탈로그 API, 클래스 상세 페이지 캐시를 버린다."""
+    cache.bump("workspace:completed" if is_published else "workspace:create")
+    cache.bump("course:api")
+    cache.bump("course:slug")
+    pagecache.clear()
+
+
+def _workspace_cards(tab, after):
+    """탭별 코스 카드 HTML 조각. 코스 생성/수정/삭제 시 invalidate_course_lists 로 무효화."""
+    key = f"workspace:{cache.namespace(f'workspace:{tab}')}:{tab}:{after or ''}"
+    html = cache.get_cache().get(key)
+    if html is None:
+        page = keyset_paginate(
+            Course.query.filter_by(is_published=(tab == "completed"))
+            .options(selectinload(Course.images)),
+            (Course.created_at, Course.id),
+            after=after, per_page=WORKSPACE_PER_PAGE,
+        )
+        html = render_template("course/_cards.html", page=page, active_tab=tab)
+        cache.get_cache().set(key, html)
+    return Markup(html)
+
+
 @bp.route("/workspace")
 def workspace():
     tab = request.args.get("tab", "create")
-
-    if tab == "completed":
-        courses = (
-            Course.query.filter_by(is_published=True)
-            .options(selectinload(Course.images))
-            .order_by(Course.created_at.desc())
-            .all()
-        )
-    else:  # create
-        courses = (
-            Course.query.filter_by(is_published=False)
-            .options(selectinload(Course.images))
-            .order_by(Course.created_at.desc())
-            .all()
-        )
+    # 'create' 탭은 코스 카드를 그리지 않으므로 조회하지 않는다
+    cards = _workspace_cards("completed", request.args.get("after")) if tab == "completed" else None
 
     return render_template(
         "course/workspace.html",
-        courses=courses,
+        cards=cards,
         active_tab=tab,
     )
 
 
+# 카탈로그 JSON API
+API_MAX_PER_PAGE = 100
+API_SORTS = {"created_at": Course.created_at, "price": Course.price}
+API_FIELDS = {"id", "classid", "description", "price", "duration_minutes",
+              "is_published", "created_at", "image", "images"}
+
+
+def _course_json(course, fields):
+    data = {}
+    for field in fields:
+        if field == "images":
+            data[field] = [upload_url(img.thumb_path or img.path) for img in course.images]
+        elif field == "image":
+            main = course.images[-1] if course.images else None
+            data[field] = upload_url(main.medium_path or main.path) if main else None
+        elif field == "created_at":
+            data[field] = course.created_at.isoformat()
+        else:
+            data[field] = getattr(course, field)
+    return data
+
+
+def _catalog_payload(args):
+    per_page = min(args.get("per_page", 20, type=int), API_MAX_PER_PAGE)
+    sort = args.get("sort", "created_at")
+    if sort not in API_SORTS or per_page < 1:
+        abort(400)
+    fields = [f for f in args.get("fields", "").split(",") if f] or sorted(API_FIELDS)
+    if not set(fields) <= API_FIELDS:
+        abort(400)
+
+    query = Course.query
+    published = args.get("published", "true")
+    if published != "all":
+        query = query.filter(Course.is_published == (published == "true"))
+    if "min_price" in args:
+        query = query.filter(Course.price >= args.get("min_price", type=int))
+    if "max_price" in args:
+        query = query.filter(Course.price <= args.get("max_price", type=int))
+    if "min_duration" in args:
+        query = query.filter(Course.duration_minutes >= args.get("min_duration", type=int))
+    if "max_duration" in args:
+        query = query.filter(Course.duration_minutes <= args.get("max_duration", type=int))
+    if {"image", "images"} & set(fields):
+        query = query.options(selectinload(Course.images))
+    else:
+        query = query.options(noload(Course.images))
+
+    page = keyset_paginate(
+        query, (API_SORTS[sort], Course.id),
+        after=args.get("after"), before=args.get("before"),
+        per_page=per_page, descending=args.get("order", "desc") != "asc", tag=sort,
+    )
+    return {
+        "items": [_course_json(c, fields) for c in page.items],
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    }
+
+
+@bp.route("/api")
+def api():
+    """코스 카탈로그. 쿼리 문자열별 응답을 캐시하고 ETag 로 304 를 돌려준다.
+
+    ?published=true|false|all &min_price= &max_price= &min_duration= &max_duration=
+    &sort=created_at|price &order=desc|asc &fields=id,classid,... &per_page= &after= / &before=
+
+    published=false|all (공개 전 코스 포함)은 로그인한 사용자만. 커서는 만들 때의 sort 에서만 쓸 수 있다.
+    """
+    for name in ("min_price", "max_price", "min_duration", "max_duration", "per_page"):
+        if name in request.args and request.args.get(name, type=int) is None:
+            abort(400)
+    drafts = request.args.get("published", "true") != "true"
+    if drafts and not current_user.is_authenticated:
+        abort(403)
+
+    key = f"course:api:{cache.namespace('course:api')}:{request.query_string.decode()}"
+    cached = cache.get_cache().get(key)
+    if cached is None:
+        body = json.dumps(_catalog_payload(request.args), ensure_ascii=False)
+        cached = (body, hashlib.sha256(body.encode()).hexdigest()[:32])
+        cache.get_cache().set(key, cached)
+    body, etag = cached
+
+    # 압축(oneday.responses)되면 본문 바이트가 달라지므로 약한 ETag: If-None-Match 도 약한 비교
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True  # 매번 재검증하되 변경 없으면 304
+    if drafts:
+        response.cache_control.private = True  # 공개 전 코스는 공유 캐시에 남기지 않는다
+    return response
+
+
 # 클래스 생성
 @bp.route("/create", methods=["GET", "POST"])
 @login_required
+@uploads.streamed_uploads(max_files=5)  # 대표 1 + 추가 4
 def create():
     form = CourseCreateForm()
 
@@ -68,36 +186,28 @@ def create():
         db.session.add(course)
         db.session.flush()  # course.id 확보
 
-        # 업로드 폴더 안에 'courses' 폴더 준비
         upload_root = current_app.config["UPLOAD_FOLDER"]   # .../uploads
-        subdir = "courses"
-        subdir_path = os.path.join(upload_root, subdir)
-        os.makedirs(subdir_path, exist_ok=True)
+        saved = []  # 커밋 후 썸네일 생성을 예약할 CourseImage 들
 
-        # --- 대표 이미지 저장 ---
+        # --- 대표 이미지 저장 (내용 해시 key, 같은 파일은 한 번만 저장) ---
         main_file = form.image.data
         if main_file and main_file.filename:
-            filename = f"{uuid.uuid4().hex}_{secure_filename(main_file.filename)}"
-            abs_path = os.path.join(subdir_path, filename)
-            main_file.save(abs_path)
-
-            # DB에는 'courses/파일명' 형태로만 저장 (uploads는 넣지 않기!)
-            rel_path = f"{subdir}/{filename}".replace("\\", "/")
+            rel_path = storage.put(main_file.stream, main_file.filename)
             course.image_path = rel_path
-            db.session.add(CourseImage(course_id=course.id, path=rel_path))
+            saved.append(CourseImage(course_id=course.id, path=rel_path))
 
         # --- 추가 이미지 저장 (최대 4장) ---
         extra_files = form.images.data or []
         for f in extra_files[:4]:
             if not f or not f.filename:
                 continue
-            filename = f"{uuid.uuid4().hex}_{secure_filename(f.filename)}"
-            abs_path = os.path.join(subdir_path, filename)
-            f.save(abs_path)
-            rel_path = f"{subdir}/{filename}".replace("\\", "/")
-            db.session.add(CourseImage(course_id=course.id, path=rel_path))
+            saved.append(CourseImage(course_id=course.id, path=storage.put(f.stream, f.filename)))
 
+        db.session.add_all(saved)
         db.session.commit()
+        invalidate_course_lists(course.is_published)
+        for img in saved:
+            images.schedule(img, upload_root, img.path)
 
         flash(f"클래스가 등록되었습니다: {course.classid}", "success")
         return redirect(url_for("course.workspace", tab="completed"))
@@ -107,22 +217,7 @@ def create():
 
 @bp.route("/uploads/<path:filename>")
 def uploaded_file(filename):
-    cleaned = filename.replace("\\", "/")
-    # 2) 혹시 실수로 'uploads/'가 앞에 붙어 오면 제거
-    if cleaned.startswith("uploads/"):
-        cleaned = cleaned[len("uploads/"):]  # 'uploads/' 제거
-
-    folder = current_app.config["UPLOAD_FOLDER"]  # 예: .../onedayclass/uploads
-    full_path = os.path.join(folder, cleaned)
-
-    # 🔎 디버그 로그
-    print("[UPLOAD] folder =", folder)
-    print("[UPLOAD] request filename =", filename)
-    print("[UPLOAD] cleaned =", cleaned)
-    print("[UPLOAD] full_path =", full_path)
-    print("[UPLOAD] exists? =", os.path.isfile(full_path))
-
-    return send_from_directory(folder, cleaned)
+    return uploads.send_upload(filename)
 
 @bp.route("/<int:course_id>/manage", methods=["GET"], endpoint="manage")
 @login_required
@@ -132,8 +227,14 @@ def manage(course_id):
 
 @bp.route("/<int:course_id>/edit", methods=["POST"], endpoint="edit")
 @login_required
+@uploads.streamed_uploads()
 def edit(course_id):
     course = Course.query.options(joinedload(Course.images)).get_or_404(course_id)
+    new_files = [f for f in request.files.getlist("images") if f and f.filename]
+    error = uploads.upload_error(new_files)
+    if error:
+        flash(error, "warning")
+        return redirect(url_for("course.manage", course_id=course.id))
 
     # 기본 필드
     course.classid     = (request.form.get("classid") or course.classid).strip()
@@ -155,24 +256,73 @@ def edit(course_id):
 
     # 새 이미지 추가
     upload_root = current_app.config["UPLOAD_FOLDER"]
-    subdir_path = os.path.join(upload_root, "courses")
-    os.makedirs(subdir_path, exist_ok=True)
-    for f in request.files.getlist("images") or []:
-        if not f or not f.filename:
-            continue
-        fname = f"{uuid.uuid4().hex}_{secure_filename(f.filename)}"
-        f.save(os.path.join(subdir_path, fname))
-        db.session.add(CourseImage(course_id=course.id, path=f"courses/{fname}".replace("\\","/")))
+    saved = [CourseImage(course_id=course.id, path=storage.put(f.stream, f.filename)) for f in new_files]
 
+    db.session.add_all(saved)
     db.session.commit()
+    invalidate_course_lists(course.is_published)
+    for img in saved:
+        images.schedule(img, upload_root, img.path)
     flash("클래스가 수정되었습니다.", "success")
     return redirect(url_for("course.workspace", tab="completed"))
 
+@bp.route("/<int:course_id>/sessions", methods=["POST"], endpoint="add_session")
+@login_required
+def add_session(course_id):
+    course = Course.query.get_or_404(course_id)
+    try:
+        starts_at = datetime.strptime(request.form.get("starts_at", ""), "%Y-%m-%dT%H:%M")
+    except ValueError:
+        flash("회차 시작 시각을 확인해 주세요.", "warning")
+        return redirect(url_for("course.manage", course_id=course.id))
+    capacity = (request.form.get("capacity") or "").strip()
+    if not capacity.isdigit() or int(capacity) < 1:
+        flash("정원은 1명 이상이어야 합니다.", "warning")
+        return redirect(url_for("course.manage", course_id=course.id))
+
+    booking.add_session(course.id, starts_at, int(capacity))
+    flash("회차가 추가되었습니다.", "success")
+    return redirect(url_for("course.manage", course_id=course.id))
+
 @bp.route("/<int:course_id>/delete", methods=["POST"], endpoint="delete")
 @login_required
 def delete(course_id):
     course = Course.query.get_or_404(course_id)
+    is_published = course.is_published
     db.session.delete(course)
     db.session.commit()
+    invalidate_course_lists(is_published)
     flash("클래스가 삭제되었습니다.", "success")
-    return redirect(url_for("course.workspace", tab="completed"))
\ No newline at end of file
+    return redirect(url_for("course.workspace", tab="completed"))
+
+
+@bp.cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="기본은 확장자로 판단")
+@click.option("--images-from", type=click.Path(file_okay=False), help="images 상대 경로의 기준 (기본: 파일 위치)")
+@click.option("--chunk", default=500, show_default=True, help="트랜잭션 하나에 넣을 줄 수")
+@click.option("--workers", default=8, show_default=True, help="이미지 복사/다운로드 동시 실행 수")
+def import_courses(path, fmt, images_from, chunk, workers):
+    """CSV/JSONL 에서 코스를 classid 기준으로 추가/갱신한다."""
+    stats = course_io.import_courses(
+        path, fmt or course_io.guess_format(path),
+        images_from or os.path.dirname(os.path.abspath(path)), chunk, workers, echo=click.echo,
+    )
+    invalidate_course_lists(True)
+    invalidate_course_lists(False)
+    click.echo(f"완료: 코스 {stats['courses']}개, 새 이미지 {stats['images']}장, 건너뜀 {stats['skipped']}줄. "
+               "썸네일은 flask images process-pending 으로 만든다.")
+
+
+@bp.cli.command("export")
+@click.argument("path", default="-")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="기본은 확장자로 판단 (표준 출력은 jsonl)")
+def export_courses(path, fmt):
+    """모든 코스를 CSV/JSONL 로 내보낸다. PATH 가 '-' 면 표준 출력."""
+    fmt = fmt or ("jsonl" if path == "-" else course_io.guess_format(path))
+    if path == "-":
+        count = course_io.export_courses(sys.stdout, fmt)
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as out:
+            count = course_io.export_courses(out, fmt)
+    click.echo(f"{count}개 코스를 내보냈습니다.", err=True)
@@ -1,15 +1,37 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, jsonify
 
+from oneday import db
 from oneday.models import Question
+from oneday.pagecache import cached_page
+from oneday.pagination import keyset_paginate, cached_count
 
 bp = Blueprint('main', __name__, url_prefix='/')
 
 @bp.route('/qna')
 def index():
-    page = request.args.get('page', default=1, type=int)  # 페이지 번호
-    question_list = Question.query.order_by(Question.create_date.desc()).paginate(page=page, per_page=30)
+    page = request.args.get('page', default=1, type=int)  # 페이지 번호 (표시용)
+    question_list = keyset_paginate(
+        Question.query, (Question.create_date, Question.id),
+        after=request.args.get('after'), before=request.args.get('before'),
+        page=page, per_page=30, total=cached_count('question', Question.query),
+    )
     return render_template('question/question_list.html', question_list=question_list)
 
 @bp.route('/')
+@cached_page()
 def home():
-    return render_template('home.html')
\ No newline at end of file
+    return render_template('home.html')
+
+# 프로세스가 살아 있는지 (liveness)
+@bp.route('/healthz')
+def healthz():
+    return jsonify(status='ok')
+
+# DB 까지 응답하는지 (readiness)
+@bp.route('/readyz')
+def readyz():
+    try:
+        db.session.execute(db.text('SELECT 1'))
+    except Exception:
+        return jsonify(status='unavailable'), 503
+    return jsonify(status='ok')
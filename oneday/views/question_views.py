@@ -1,40 +1,104 @@
-import os
 from datetime import datetime
-from flask import Blueprint, render_template, request, url_for, redirect, flash, current_app
+
+import click
+from flask import Blueprint, render_template, request, url_for, redirect, flash, current_app, jsonify
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
-from oneday import db
+from oneday import db, images, search, storage, uploads
 from oneday.forms import QuestionForm, AnswerForm
-from oneday.models import Question
+from oneday.models import Question, Answer
+from oneday.pagination import keyset_paginate, cached_count, forget_count, encode_cursor
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload
 
 bp = Blueprint('question', __name__, url_prefix='/question')
 
 @bp.route('/list/')
 def _list():
     page = request.args.get('page', 1, type=int)
-    questions = Question.query.order_by(Question.create_date.desc()).paginate(page=page, per_page=30)
+    questions = keyset_paginate(
+        Question.query, (Question.create_date, Question.id),
+        after=request.args.get('after'), before=request.args.get('before'),
+        page=page, per_page=30, total=cached_count('question', Question.query),
+    )
     return render_template('question/question_list.html', question_list=questions)
 
+@bp.route('/search/')
+def search_list():
+    keyword = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    per_page = 30
+    short = search.short_terms(keyword)
+    if short:
+        # 짧은 단어는 색인으로 못 찾는다: 전체를 훑는 대신 다시 입력받는다
+        flash('검색어는 단어마다 {}글자 이상 입력해 주세요: {}'.format(search.TRIGRAM, ' '.join(short)))
+        results = []
+    else:
+        results = search.search(keyword, limit=per_page + 1, offset=(max(page, 1) - 1) * per_page)
+    return render_template('question/question_search.html', keyword=keyword, page=page,
+                           results=results[:per_page], has_next=len(results) > per_page)
+
+ANSWERS_PER_PAGE = 20
+
+
+def _answer_page(question_id, after=None, before=None):
+    # 작성자는 JOIN 으로 같이 읽어 답변 수와 상관없이 쿼리 1번
+    return keyset_paginate(
+        Answer.query.filter_by(question_id=question_id).options(joinedload(Answer.user)),
+        (Answer.create_date, Answer.id),
+        after=after, before=before, per_page=ANSWERS_PER_PAGE, descending=False,
+    )
+
+
+def render_detail(question_id, form):
+    """질문(작성자 포함) 1번 + 답변 한 페이지 1번, 고정 2쿼리로 상세 화면을 그린다."""
+    question = (
+        Question.query.options(joinedload(Question.user))
+        .filter_by(id=question_id).first_or_404()
+    )
+    answers = _answer_page(question_id, request.args.get('after'), request.args.get('before'))
+    return render_template('question/question_detail.html', question=question, answers=answers, form=form)
+
+
+def answer_page_url(answer):
+    """answer 가 마지막 항목으로 보이는 답변 페이지 주소. 첫 페이지에 들어가면 그냥 상세 주소."""
+    earlier = db.session.execute(
+        db.select(Answer.create_date, Answer.id)
+        .where(Answer.question_id == answer.question_id,
+               tuple_(Answer.create_date, Answer.id) < tuple_(answer.create_date, answer.id))
+        .order_by(Answer.create_date.desc(), Answer.id.desc())
+        .offset(ANSWERS_PER_PAGE - 1).limit(1)
+    ).first()
+    if earlier is None:
+        return url_for('question.detail', question_id=answer.question_id)
+    return url_for('question.detail', question_id=answer.question_id,
+                   after=encode_cursor(list(earlier)), _anchor=f'answer_{answer.id}')
+
+
 @bp.route('/detail/<int:question_id>/')
 def detail(question_id):
-    question = Question.query.get_or_404(question_id)
-    form = AnswerForm()
-    return render_template('question/question_detail.html', question=question, form=form)
+    return render_detail(question_id, AnswerForm())
+
+
+@bp.route('/detail/<int:question_id>/answers')
+def answers(question_id):
+    """'답변 더 보기' 용 JSON: 다음 답변 카드 HTML 과 그다음 커서."""
+    page = _answer_page(question_id, after=request.args.get('after'))
+    return jsonify(
+        html=render_template('question/_answers.html', answer_items=page.items),
+        next_cursor=page.next_cursor,
+    )
 
 @bp.route('/create/', methods=['GET','POST'])
 @login_required
+@uploads.streamed_uploads(max_files=1)
 def create():
     form = QuestionForm()
     if request.method == 'POST' and form.validate_on_submit():
         image_file = form.image.data
         image_path = None
         if image_file:
-            today = datetime.now().strftime('%Y%m%d')
-            upload_folder = os.path.join(current_app.root_path, 'static/photo', today)
-            os.makedirs(upload_folder, exist_ok=True)
-            filename = secure_filename(image_file.filename)
-            image_file.save(os.path.join(upload_folder, filename))
-            image_path = f'photo/{today}/{filename}'
+            # 내용 해시로 저장하므로 이름이 같은 다른 파일을 덮어쓰지 않는다
+            image_path = storage.put(image_file.stream, image_file.filename)
 
         question = Question(
             subject=form.subject.data,
@@ -45,6 +109,9 @@ def create():
         )
         db.session.add(question)
         db.session.commit()
+        forget_count('question')
+        if image_path:
+            images.schedule(question, current_app.config['UPLOAD_FOLDER'], image_path)
         return redirect(url_for('question._list'))
     return render_template('question/question_form.html', form=form)
 
@@ -72,4 +139,25 @@ def delete(question_id):
         return redirect(url_for('question.detail', question_id=question_id))
     db.session.delete(question)
     db.session.commit()
+    forget_count('question')
     return redirect(url_for('question._list'))
+
+
+@bp.cli.command('recount-answers')
+def recount_answers():
+    """answer_count 컬럼을 실제 답변 수로 다시 맞춘다 (상관 서브쿼리 UPDATE 한 번)."""
+    answer_total = (
+        db.select(func.count(Answer.id))
+        .where(Answer.question_id == Question.id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(db.update(Question).values(answer_count=answer_total))
+    db.session.commit()
+    click.echo(f'{result.rowcount}개 질문의 답변 수를 갱신했습니다.')
+
+
+@bp.cli.command('reindex')
+def reindex():
+    """질문/답변 검색 색인(question_fts)을 기존 데이터로 다시 만든다."""
+    total = search.rebuild()
+    click.echo(f'{total}개 질문을 색인했습니다.')
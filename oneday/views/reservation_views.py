@@ -1,23 +1,87 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, jsonify, abort
 from flask_login import login_required, current_user
+from sqlalchemy import case, func
 
-from oneday.models import db, Reservation
+from oneday import booking
+from oneday.pagination import keyset_paginate
+from oneday.models import db, Reservation, ClassSession, Course, DayOccupancy, User
 import datetime
 
 bp = Blueprint("reservations", __name__, url_prefix="/reservations")
 
 
+RESERVATIONS_PER_PAGE = 20
+WHEN_FILTERS = ("all", "upcoming", "past")
+SESSION_EDIT_MESSAGE = "회차 예약은 회차를 골라서만 변경할 수 있습니다."
+
+
+def _status_summary(user_id, today):
+    """상태별 (전체, 다가오는) 예약 수. GROUP BY 한 번으로 (user_id, reserved_date) 인덱스만 훑는다."""
+    rows = (
+        db.session.query(
+            Reservation.status,
+            func.count(Reservation.id),
+            func.sum(case((Reservation.reserved_date >= today, 1), else_=0)),
+        )
+        .filter(Reservation.user_id == user_id)
+        .group_by(Reservation.status)
+        .all()
+    )
+    return {status: (total, upcoming or 0) for status, total, upcoming in rows}
+
+
 # 예약 목록
 @bp.route("/")
 @login_required
 def reservation_list():
-    reservations = (
-        Reservation.query
-        .filter_by(user_id=current_user.id)
-        .order_by(Reservation.reserved_date.desc())
-        .all()
+    """?when=upcoming|past, ?status= 로 거르고 (reserved_date, id) keyset 으로 한 페이지씩 보여준다.
+
+    다가오는 예약은 가까운 날짜부터, 지난 예약/전체는 최근 날짜부터.
+    """
+    today = datetime.date.today()
+    when = request.args.get("when", "all")
+    if when not in WHEN_FILTERS:
+        when = "all"
+    summary = _status_summary(current_user.id, today)
+    status = request.args.get("status") or None
+    if status not in summary:
+        status = None
+
+    query = Reservation.query.filter(Reservation.user_id == current_user.id)
+    if when == "upcoming":
+        query = query.filter(Reservation.reserved_date >= today)
+    elif when == "past":
+        query = query.filter(Reservation.reserved_date < today)
+    if status:
+        query = query.filter(Reservation.status == status)
+
+    # 페이저에 쓸 건수도 요약에서 바로 계산한다 (COUNT 쿼리를 따로 날리지 않는다)
+    counts = [summary[status]] if status else summary.values()
+    total = sum(
+        upcoming if when == "upcoming" else n - upcoming if when == "past" else n
+        for n, upcoming in counts
+    )
+
+    reservations = keyset_paginate(
+        query, (Reservation.reserved_date, Reservation.id),
+        after=request.args.get("after"), before=request.args.get("before"),
+        page=request.args.get("page", default=1, type=int),
+        per_page=RESERVATIONS_PER_PAGE, total=total,
+        descending=when != "upcoming",
+    )
+    return render_template(
+        "reservation/reservation_list.html",
+        reservations=reservations,
+        summary=summary,
+        when=when,
+        status=status,
     )
-    return render_template("reservation/reservation_list.html", reservations=reservations)
 
 
 
@@ -34,27 +98,54 @@ def reservation_detail(res_id):
     return render_template("reservation/reservation_detail.html", reservation=reservation)
 
 
-
 # 예약 생성/수정
 @bp.route("/new", methods=["GET", "POST"])
 @bp.route("/<int:res_id>/edit", methods=["GET", "POST"])
 @login_required
 def reservation_form(res_id=None):
-    reservation = Reservation.query.get(res_id) if res_id else None
+    reservation = Reservation.query.get_or_404(res_id) if res_id else None
+    if reservation and reservation.user_id != current_user.id:  # 남의 예약은 수정/좌석 이동 불가
+        abort(403)
     selected_date = request.args.get("date")
     class_name = request.args.get("class_name")
+    course_id = request.args.get("course_id", type=int)
+    if reservation and reservation.session:
+        course_id = reservation.session.course_id
 
     if request.method == "POST":
+        session_id = request.form.get("session_id", type=int)
+        if session_id:  # 회차 예약: 좌석 확보는 booking 에서 원자적으로
+            try:
+                if reservation:
+                    booking.move(reservation, session_id)
+                else:
+                    booking.book(session_id, current_user.id)
+            except booking.BookingError as e:
+                flash(str(e))
+                return redirect(request.url)
+            return redirect(url_for("reservations.reservation_list"))
+
+        if reservation and reservation.session_id:
+            flash(SESSION_EDIT_MESSAGE)
+            return redirect(request.url)
+
         class_name = request.form["class_name"]
         reserved_date = request.form["reserved_date"]
         reserved_time = request.form["reserved_time"]
 
         if reservation:  # 수정
-            reservation.class_name = class_name
-            reservation.reserved_date = datetime.datetime.strptime(
-                reserved_date, "%Y-%m-%d"
-            ).date()
-            reservation.reserved_time = reserved_time
+            # 회차 예약이면 좌석 수/회차가 어긋나므로 바꾸지 않는다 (그 사이 회차로 옮겨졌어도)
+            updated = Reservation.query.filter(
+                Reservation.id == reservation.id, Reservation.session_id.is_(None)
+            ).update({
+                Reservation.class_name: class_name,
+                Reservation.reserved_date: datetime.datetime.strptime(reserved_date, "%Y-%m-%d").date(),
+                Reservation.reserved_time: reserved_time,
+            }, synchronize_session=False)
+            if not updated:
+                db.session.rollback()
+                flash(SESSION_EDIT_MESSAGE)
+                return redirect(request.url)
         else:  # 새 예약
             new_res = Reservation(
                 user_id=current_user.id,
@@ -63,22 +154,87 @@ def reservation_form(res_id=None):
                     reserved_date, "%Y-%m-%d"
                 ).date(),
                 reserved_time=reserved_time,
-                status="대기중"
+                status=booking.PENDING
             )
             db.session.add(new_res)
 
         db.session.commit()
         return redirect(url_for("reservations.reservation_list"))
 
+    sessions = None
+    if course_id:
+        sessions = (
+            ClassSession.query
+            .filter(ClassSession.course_id == course_id,
+                    ClassSession.starts_at >= datetime.datetime.now())
+            .order_by(ClassSession.starts_at)
+            .all()
+        )
+
     return render_template(
         "reservation/reservation_form.html",
         reservation=reservation,
         selected_date=selected_date,
-        class_name=class_name
+        class_name=class_name,
+        sessions=sessions
     )
 
 
 
+# 월간 예약 가능 현황 (달력 위젯용)
+@bp.route("/availability/<int:course_id>")
+def availability(course_id):
+    """?month=YYYY-MM 의 일별/회차별 잔여 좌석.
+
+    일별 합계는 course_day_occupancy 에서, 회차는 (course_id, starts_at) 인덱스 범위로
+    읽으므로 예약 건수와 상관없이 그 달의 날짜/회차 수만큼만 읽는다.
+    """
+    try:
+        first = datetime.datetime.strptime(request.args.get("month", ""), "%Y-%m").date()
+    except ValueError:
+        first = datetime.date.today().replace(day=1)
+    last = (first + datetime.timedelta(days=32)).replace(day=1)
+
+    days = (
+        DayOccupancy.query
+        .filter(DayOccupancy.course_id == course_id,
+                DayOccupancy.day >= first, DayOccupancy.day < last)
+        .order_by(DayOccupancy.day)
+        .all()
+    )
+    sessions = (
+        ClassSession.query
+        .filter(ClassSession.course_id == course_id,
+                ClassSession.starts_at >= datetime.datetime.combine(first, datetime.time()),
+                ClassSession.starts_at < datetime.datetime.combine(last, datetime.time()))
+        .order_by(ClassSession.starts_at)
+        .all()
+    )
+    slots = {}
+    for s in sessions:
+        slots.setdefault(s.starts_at.date(), []).append({
+            "session_id": s.id,
+            "starts_at": s.starts_at.isoformat(),
+            "capacity": s.capacity,
+            "seats_left": s.seats_left,
+        })
+
+    return jsonify({
+        "course_id": course_id,
+        "month": first.strftime("%Y-%m"),
+        "days": [
+            {
+                "date": d.day.isoformat(),
+                "capacity": d.capacity,
+                "seats_left": d.seats_left,
+                "slots": slots.get(d.day, []),
+            }
+            for d in days
+        ],
+    })
+
+
+
 @bp.route("/<int:res_id>/delete", methods=["POST"])
 @login_required
 def delete_reservation(res_id):
@@ -86,9 +242,61 @@ def delete_reservation(res_id):
     if reservation.user_id != current_user.id:
         flash("해당 예약을 삭제할 수 없습니다.")
         return redirect(url_for("reservations.reservation_list"))
-    db.session.delete(reservation)
-    db.session.commit()
+    booking.cancel(reservation)
     flash("예약이 삭제되었습니다.")
     return redirect(url_for("reservations.reservation_list"))
 
 
+@bp.cli.command("load-test")
+@click.option("--bookings", default=300, help="동시에 시도할 예약 수")
+@click.option("--capacity", default=50, help="테스트 회차 정원")
+@click.option("--threads", default=32, help="동시 실행 스레드 수")
+def load_test(bookings, capacity, threads):
+    """임시 회차 하나에 동시 예약을 몰아 넣고 초과 판매가 없는지 확인한다."""
+    app = current_app._get_current_object()
+    stamp = uuid.uuid4().hex[:8]
+    course = Course(classid=f"loadtest-{stamp}", description="load test", price=0)
+    db.session.add(course)
+    db.session.flush()
+    users = [User(username=f"lt-{stamp}-{i}", email=f"lt-{stamp}-{i}@example.com", password="!")
+             for i in range(bookings)]
+    db.session.add_all(users)
+    session_ = booking.add_session(course.id, datetime.datetime.now() + datetime.timedelta(days=1), capacity)
+    session_id, user_ids = session_.id, [u.id for u in users]
+
+    def attempt(user_id):
+        with app.app_context():
+            try:
+                booking.book(session_id, user_id)
+                return "ok"
+            except booking.BookingError:
+                return "rejected"
+            except Exception as e:  # 잠금 재시도까지 실패한 경우 등
+                return type(e).__name__
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = Counter(pool.map(attempt, user_ids))
+    elapsed = time.perf_counter() - started
+
+    db.session.expire_all()
+    taken = db.session.get(ClassSession, session_id).seats_taken
+    day_taken = DayOccupancy.query.filter_by(course_id=course.id).one().seats_taken
+    rows = Reservation.query.filter_by(session_id=session_id).count()
+    click.echo(f"{bookings}건 / {elapsed:.2f}s: {dict(outcomes)}")
+    click.echo(f"정원 {capacity}, seats_taken {taken}, 일별 합계 {day_taken}, 예약 행 {rows}")
+
+    Reservation.query.filter_by(session_id=session_id).delete()
+    User.query.filter(User.id.in_(user_ids)).delete()
+    db.session.delete(db.session.get(Course, course.id))
+    db.session.commit()
+
+    if not (taken == day_taken == rows == outcomes["ok"] <= capacity):
+        raise click.ClickException("초과 판매 또는 좌석 수 불일치가 발생했습니다.")
+
+
+@bp.cli.command("rebuild-occupancy")
+def rebuild_occupancy():
+    """class_session 기준으로 일별 예약 현황 테이블을 다시 만든다."""
+    total = booking.rebuild_occupancy()
+    click.echo(f"{total}개 (코스, 날짜) 행을 만들었습니다.")
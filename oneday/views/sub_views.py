@@ -1,36 +1,55 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, abort, redirect, url_for
+from sqlalchemy.orm import selectinload
+
+from oneday import cache
+from oneday.models import Course
+from oneday.pagecache import cached_page
+from oneday.uploads import upload_url
 
 # 블루프린트 생성
 bp = Blueprint('sub', __name__, url_prefix='/')
 
-@bp.route('/about')
-def about():
-    return render_template('about.html')
-
-@bp.route('/about2')
-def about2():
-    return render_template('about2.html')
-
-@bp.route('/about3')
-def about3():
-    return render_template('about3.html')
-
-@bp.route('/about4')
-def about4():
-    return render_template('about4.html')
-
-@bp.route('/about5')
-def about5():
-    return render_template('about5.html')
-
-@bp.route('/about6')
-def about6():
-    return render_template('about6.html')
-
-@bp.route('/about7')
-def about7():
-    return render_template('about7.html')
-
-@bp.route('/about8')
-def about8():
-    return render_template('about8.html')
\ No newline at end of file
+# 예전 소개 페이지(/about, /about2 ...) 번호 -> 클래스 slug. 광고 링크가 남아 있어 영구 이동으로 돌려준다
+LEGACY_ABOUT = {
+    1: 'group-cooking', 2: 'parents-day-cake', 3: 'photo-pt', 4: 'signature-drawing',
+    5: 'flying-yoga', 6: 'whisky-cocktail', 7: 'coffee-dripbag', 8: 'vocal-mbti',
+}
+
+
+def _class_page(slug):
+    """slug 의 공개 클래스 화면 데이터. invalidate_course_lists 가 'course:slug' 를 올리면 다시 읽는다."""
+    key = f"course:slug:{cache.namespace('course:slug')}:{slug}"
+    data = cache.get_cache().get(key)
+    if data is None:
+        course = (
+            Course.query.options(selectinload(Course.images))
+            .filter_by(slug=slug, is_published=True).first()
+        )
+        if course is None:  # 없는 slug 는 캐시에 넣지 않는다 (임의 URL 로 캐시를 밀어내지 못하게)
+            abort(404)
+        main = course.images[-1] if course.images else None
+        data = {
+            'id': course.id,
+            'title': course.title or course.classid,
+            'price': course.price,
+            'lead_days': course.lead_days,
+            'details': course.details or {},
+            'cover': upload_url(main.medium_path or main.path) if main else course.cover_url,
+        }
+        cache.get_cache().set(key, data)
+    return data
+
+
+# 코스 수정/비공개 전환이 바로 보여야 하므로 메모리 캐시만 (미리 렌더링 파일은 invalidate 할 수 없다)
+@bp.route('/class/<slug>')
+@cached_page(on_disk=False)
+def class_detail(slug):
+    return render_template('class_detail.html', course=_class_page(slug))
+
+
+@bp.route('/about', defaults={'number': 1})
+@bp.route('/about<int:number>')
+def about(number):
+    if number not in LEGACY_ABOUT:
+        abort(404)
+    return redirect(url_for('sub.class_detail', slug=LEGACY_ABOUT[number]), code=301)
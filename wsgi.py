@@ -0,0 +1,4 @@
+# gunicorn 진입점: gunicorn -c gunicorn.conf.py wsgi:app
+from oneday import create_app
+
+app = create_app()